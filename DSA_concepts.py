@@ -4,10 +4,17 @@ Educational examples showing data structures and algorithms in action
 """
 
 from collections import deque
-import time
 import hashlib
 import random
 
+import ciphers
+from benchmark import measure
+
+
+def median_seconds(func, *args):
+    """Median of repeated perf_counter_ns runs - single time.time() calls are too coarse here"""
+    return measure(func, *args, warmup=1, repeat=50, budget=0.2)['p50_ns'] / 1e9
+
 class DSADemo:
     def __init__(self):
         # Data Structures
@@ -71,15 +78,13 @@ class DSADemo:
         algorithms = ['caesar', 'hash', 'reverse']
         
         for algo in algorithms:
-            start_time = time.time()
-            
             # O(1) lookup regardless of table size
             if algo in self.algorithm_map:
                 func = self.algorithm_map[algo]
                 result = func("demo")
-                lookup_time = time.time() - start_time
+                lookup_time = median_seconds(lambda: self.algorithm_map[algo]("demo"))
                 
-                print(f"  {algo.capitalize()}: {result} (Time: {lookup_time:.6f}s)")
+                print(f"  {algo.capitalize()}: {result} (Time: {lookup_time:.9f}s)")
         
         print("  ✅ Hash table provides constant-time access\n")
     
@@ -94,23 +99,16 @@ class DSADemo:
             test_data = "a" * size
             
             # O(n) - Linear time algorithms
-            start = time.time()
-            self.caesar_cipher(test_data)
-            caesar_time = time.time() - start
-            
-            start = time.time()
-            self.hash_function(test_data)
-            hash_time = time.time() - start
+            caesar_time = median_seconds(self.caesar_cipher, test_data)
+            hash_time = median_seconds(self.hash_function, test_data)
             
             # O(1) - Constant time lookup
-            start = time.time()
-            self.algorithm_map.get('caesar')
-            lookup_time = time.time() - start
+            lookup_time = median_seconds(self.algorithm_map.get, 'caesar')
             
             print(f"  Input size {size:,} characters:")
-            print(f"    Caesar O(n):    {caesar_time:.6f}s")
-            print(f"    Hash O(n):      {hash_time:.6f}s")
-            print(f"    Lookup O(1):    {lookup_time:.6f}s")
+            print(f"    Caesar O(n):    {caesar_time:.9f}s")
+            print(f"    Hash O(n):      {hash_time:.9f}s")
+            print(f"    Lookup O(1):    {lookup_time:.9f}s")
         print()
     
     def sorting_comparison(self):
@@ -123,19 +121,13 @@ class DSADemo:
         print(f"  Original data: {data[:10]}... (showing first 10)")
         
         # Bubble Sort - O(n²)
-        bubble_data = data.copy()
-        start = time.time()
-        self.bubble_sort(bubble_data)
-        bubble_time = time.time() - start
+        bubble_time = median_seconds(lambda: self.bubble_sort(data.copy()))
         
         # Built-in Sort - O(n log n)
-        builtin_data = data.copy()
-        start = time.time()
-        builtin_data.sort()
-        builtin_time = time.time() - start
+        builtin_time = median_seconds(lambda: data.copy().sort())
         
-        print(f"  Bubble Sort O(n²):      {bubble_time:.6f}s")
-        print(f"  Built-in Sort O(n log n): {builtin_time:.6f}s")
+        print(f"  Bubble Sort O(n²):      {bubble_time:.9f}s")
+        print(f"  Built-in Sort O(n log n): {builtin_time:.9f}s")
         print(f"  Speedup factor: {bubble_time/builtin_time:.1f}x faster\n")
     
     def search_comparison(self):
@@ -148,18 +140,16 @@ class DSADemo:
         target = 750
         
         # Linear Search - O(n)
-        start = time.time()
         linear_result = self.linear_search(data, target)
-        linear_time = time.time() - start
+        linear_time = median_seconds(self.linear_search, data, target)
         
         # Binary Search - O(log n)
-        start = time.time()
         binary_result = self.binary_search(data, target)
-        binary_time = time.time() - start
+        binary_time = median_seconds(self.binary_search, data, target)
         
         print(f"  Searching for {target} in {len(data):,} items:")
-        print(f"  Linear Search O(n):     Index {linear_result}, {linear_time:.6f}s")
-        print(f"  Binary Search O(log n): Index {binary_result}, {binary_time:.6f}s")
+        print(f"  Linear Search O(n):     Index {linear_result}, {linear_time:.9f}s")
+        print(f"  Binary Search O(log n): Index {binary_result}, {binary_time:.9f}s")
         
         if linear_time > 0 and binary_time > 0:
             speedup = linear_time / binary_time
@@ -170,15 +160,8 @@ class DSADemo:
     # Helper algorithms with different complexities
     def caesar_cipher(self, text, shift=3):
         """Caesar cipher - O(n) time complexity"""
-        result = ""
-        for char in text:  # O(n) - visit each character once
-            if char.isalpha():
-                base = 65 if char.isupper() else 97
-                shifted = (ord(char) - base + shift) % 26 + base
-                result += chr(shifted)
-            else:
-                result += char
-        return result
+        # O(n) - one table lookup per character via precomputed shift tables
+        return ciphers.caesar(text, shift)
     
     def hash_function(self, text):
         """SHA-256 hash - O(n) time complexity"""
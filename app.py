@@ -1,157 +1,979 @@
-from flask import Flask, render_template, request, jsonify
-from cryptography.fernet import Fernet
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
-import base64, hashlib, secrets, string
-from collections import deque
+from flask import Flask, Response, render_template, request, jsonify, stream_with_context
+import base64, hashlib, hmac, secrets
+from concurrent.futures import ThreadPoolExecutor
+import importlib
 import time
 import os
 
+from caches import KeyCache, ResultCache
+from stats_store import StatsStore, LATENCY_BOUNDS_NS
+import ciphers
+import frames
+import hashing
+import jobs
+import kdf
+import keygen
+import metrics
+import offload
+import stream_cipher
+
 app = Flask(__name__)
 
+METHODS = ('caesar', 'fernet', 'hash') + ciphers.CIPHERS
+
+# Fernet tokens are "<version>.<body>"; unversioned tokens are the legacy double-base64 format.
+#   v2.<fernet token>                           fixed legacy salt
+#   v3.<kdf>.<params>.<salt>.<fernet token>     per-message salt and KDF parameters
+TOKEN_VERSION = 'v3'
+LEGACY_SALT = b'salt123'
+LEGACY_KDF = ('pbkdf2', {'i': 100000})
+SALT_SIZE = 16
+DEFAULT_KDF = os.environ.get('KDF', 'pbkdf2')
+SALT_REUSE_SECONDS = float(os.environ.get('SALT_REUSE_SECONDS', 300))
+
+MAX_BATCH_ITEMS = int(os.environ.get('MAX_BATCH_ITEMS', 10000))
+BATCH_WORKERS = int(os.environ.get('BATCH_WORKERS', os.cpu_count() or 4))
+BATCH_HEAVY_CHARS = 64 * 1024   # texts at least this long are hashed/shifted on the pool
+OFFLOAD_HASH_CHARS = 1024 * 1024   # hashes at least this long count as heavy work
+MAX_BINARY_BYTES = int(os.environ.get('MAX_BINARY_BYTES', 256 * 1024 * 1024))
+BINARY_TYPES = ('application/octet-stream', frames.CONTENT_TYPE)
+PROGRESS_WINDOW = 4 * 1024 * 1024   # job progress granularity
+
 class CryptoEngine:
+    """Text ciphers over str, plus *_bytes forms for any buffer-protocol object.
+    
+    The bytes forms skip the encode/decode round trips and, where an out
+    buffer is accepted, write the result straight into it. Caesar and the
+    polyalphabetic ciphers keep a str path, because str.translate beats
+    encode + bytes.translate + decode.
+    """
+    
     def __init__(self):
-        self.history = deque(maxlen=10)
+        self.stats = StatsStore()
+        self.key_cache = KeyCache(
+            max_size=int(os.environ.get('KEY_CACHE_SIZE', 128)),
+            ttl=float(os.environ.get('KEY_CACHE_TTL', 300))
+        )
+        self._cache_secret = secrets.token_bytes(32)
+        # Only pure functions (Caesar, SHA-256) go here; Fernet output is randomized and never cached
+        self.result_cache = ResultCache(
+            max_bytes=int(os.environ.get('RESULT_CACHE_BYTES', 32 * 1024 * 1024)),
+            max_item=int(os.environ.get('RESULT_CACHE_MAX_ITEM', 64 * 1024)),
+            directory=os.environ.get('RESULT_CACHE_DIR') or None
+        )
+        self._session_salt = (None, 0.0)
+        self.hash_sessions = hashing.HashSessions(
+            max_sessions=int(os.environ.get('HASH_SESSIONS', 1024)),
+            ttl=float(os.environ.get('HASH_SESSION_TTL', 3600))
+        )
+        self.key_pool = keygen.KeyPool(size=int(os.environ.get('KEY_POOL_SIZE', 0)))
+        self.kdf_params = {name: dict(impl.defaults) for name, impl in kdf.KDFS.items()}
+        if os.environ.get('KDF_CALIBRATE_MS'):
+            self.calibrate_kdfs(float(os.environ['KDF_CALIBRATE_MS']))
+    
+    def calibrate_kdfs(self, target_ms=50):
+        """Benchmark this host and pick KDF parameters near target_ms per derivation"""
+        for name in kdf.KDFS:
+            self.kdf_params[name] = kdf.calibrate(name, target_ms)
+        return self.kdf_params
     
     def caesar_cipher(self, text, shift=3, decrypt=False):
-        if decrypt: 
-            shift = -shift
-        result = ""
-        for char in text:
-            if char.isalpha():
-                base = 65 if char.isupper() else 97
-                result += chr((ord(char) - base + shift) % 26 + base)
+        started = time.perf_counter_ns()
+        cache_key = None
+        if self.result_cache.cacheable(text):
+            cache_key = self.result_cache.key('caesar', (-shift if decrypt else shift) % 26, text)
+            result = self.result_cache.get(cache_key)
+            if result is not None:
+                self._record('Caesar', len(text), started)
+                return result
+        
+        with metrics.phase('cipher'):
+            result = ciphers.caesar(text, shift, decrypt)
+        if cache_key is not None:
+            self.result_cache.put(cache_key, result)
+        self._record('Caesar', len(text), started)
+        return result
+    
+    def caesar_bytes(self, data, shift=3, decrypt=False, out=None, progress=None):
+        """Caesar over the ASCII letters of data; fills out (may be data itself) when given
+        
+        With progress set, data is processed in PROGRESS_WINDOW slices and
+        progress(n) is called after each one (see _slices).
+        """
+        started = time.perf_counter_ns()
+        with metrics.phase('cipher'):
+            if progress is None:
+                result = ciphers.caesar_bytes(data, shift, decrypt, out)
+            else:
+                view, result, target = _output_views(data, out)
+                for start, end in _slices(len(view), progress):
+                    ciphers.caesar_bytes(view[start:end], shift, decrypt, out=target[start:end])
+        self._record('Caesar', memoryview(data).nbytes, started)
+        return result
+    
+    def polyalphabetic_cipher(self, method, text, key, decrypt=False):
+        """Vigenere, Beaufort or autokey under a cached, precompiled key schedule"""
+        started = time.perf_counter_ns()
+        with metrics.phase('kdf'):
+            schedule = ciphers.compile_key(method, key, decrypt)
+        with metrics.phase('cipher'):
+            result = schedule.apply(text)
+        self._record(method.capitalize(), len(text), started)
+        return result
+    
+    def polyalphabetic_bytes(self, method, data, key, decrypt=False, out=None, progress=None):
+        """polyalphabetic_cipher over the ASCII letters of data; fills out when given"""
+        started = time.perf_counter_ns()
+        with metrics.phase('kdf'):
+            schedule = ciphers.compile_key(method, key, decrypt)
+        with metrics.phase('cipher'):
+            if progress is None:
+                result = schedule.apply_bytes(data, out=out)
             else:
-                result += char
-        self._add_history('Caesar', len(text))
+                view, result, target = _output_views(data, out)
+                for start, end in _slices(len(view), progress):
+                    # The key carries on from this slice's plaintext, which an in-place
+                    # encryption is about to overwrite
+                    source, dest = view[start:end], target[start:end]
+                    if not decrypt:
+                        key = ciphers.continue_key(method, key, source)
+                    schedule.apply_bytes(source, out=dest)
+                    if decrypt:
+                        key = ciphers.continue_key(method, key, dest)
+                    schedule = ciphers.compile_key(method, key, decrypt)
+        self._record(method.capitalize(), memoryview(data).nbytes, started)
         return result
     
-    def fernet_encrypt(self, text, password="defaultpass"):
+    def fernet_encrypt(self, text, password="defaultpass", kdf_name=None):
         try:
-            key = self._gen_key(password)
-            f = Fernet(key)
-            encrypted = f.encrypt(text.encode())
-            result = base64.urlsafe_b64encode(encrypted).decode()
-            self._add_history('AES', len(text))
-            return result
+            return self.fernet_encrypt_bytes(text.encode(), password, kdf_name).decode()
         except Exception as e:
             return f"Error: {str(e)}"
     
+    def fernet_encrypt_bytes(self, data, password="defaultpass", kdf_name=None):
+        """Fernet token (ASCII bytes) for data; raises on failure"""
+        started = time.perf_counter_ns()
+        kdf_name = kdf_name or DEFAULT_KDF
+        params = self.kdf_params[kdf.get(kdf_name).name]
+        salt = self._current_salt()
+        with metrics.phase('kdf'):
+            key = self._gen_key(password, salt, kdf_name, params)
+        with metrics.phase('cipher'):
+            # Fernet only accepts bytes, so other buffers cost one copy here
+            encrypted = _fernet(key).encrypt(data if isinstance(data, bytes) else bytes(data))
+        with metrics.phase('encode'):
+            encoded_salt = base64.urlsafe_b64encode(salt).rstrip(b'=').decode()
+            header = f'{TOKEN_VERSION}.{kdf_name}.{kdf.format_params(params)}.{encoded_salt}.'
+            result = header.encode() + encrypted
+        self._record('AES', memoryview(data).nbytes, started)
+        return result
+    
     def fernet_decrypt(self, encrypted_text, password="defaultpass"):
         try:
-            key = self._gen_key(password)
-            f = Fernet(key)
-            encrypted_data = base64.urlsafe_b64decode(encrypted_text.encode())
-            decrypted = f.decrypt(encrypted_data)
-            return decrypted.decode()
+            return self.fernet_decrypt_bytes(encrypted_text.encode(), password).decode()
         except:
             return "Wrong password entered"
     
+    def fernet_decrypt_bytes(self, token, password="defaultpass"):
+        """Plaintext bytes for a Fernet token given as any bytes-like object; raises on failure"""
+        started = time.perf_counter_ns()
+        with metrics.phase('encode'):
+            salt, kdf_name, params, encrypted_data = self._parse_token(str(token, 'ascii'))
+        with metrics.phase('kdf'):
+            key = self._gen_key(password, salt, kdf_name, params)
+        with metrics.phase('cipher'):
+            decrypted = _fernet(key).decrypt(encrypted_data)
+        self._record('AES', len(decrypted), started)
+        return decrypted
+    
+    def stream_encrypt(self, reader, password="defaultpass", chunk_size=stream_cipher.DEFAULT_CHUNK_SIZE):
+        started = time.perf_counter_ns()
+        params = self.kdf_params[DEFAULT_KDF]
+        salt = secrets.token_bytes(SALT_SIZE)
+        key = self._stream_key(password, salt, DEFAULT_KDF, params)
+        kdf_spec = f'{DEFAULT_KDF}.{kdf.format_params(params)}'
+        segments = stream_cipher.encrypt_stream(key, salt, kdf_spec, reader, chunk_size)
+        yield next(segments)
+        total = 0
+        for segment in segments:
+            total += len(segment) - stream_cipher.LENGTH.size - stream_cipher.TAG_SIZE
+            yield segment
+        self._record('AES-Stream', total, started)
+    
+    def stream_decrypt(self, reader, password="defaultpass"):
+        started = time.perf_counter_ns()
+        
+        def key_for(salt, kdf_spec):
+            if salt is None:
+                return self._stream_key(password)
+            try:
+                kdf_name, _, params = kdf_spec.partition('.')
+                params = kdf.parse_params(kdf_name, params)
+            except ValueError:
+                raise stream_cipher.StreamError("Invalid key derivation in header") from None
+            return self._stream_key(password, salt, kdf_name, params)
+        
+        total = 0
+        for chunk in stream_cipher.decrypt_stream(key_for, reader):
+            total += len(chunk)
+            yield chunk
+        self._record('AES-Stream', total, started)
+    
     def hash_encrypt(self, text):
-        result = hashlib.sha256(text.encode()).hexdigest()
-        self._add_history('Hash', len(text))
+        started = time.perf_counter_ns()
+        cache_key = None
+        if self.result_cache.cacheable(text):
+            cache_key = self.result_cache.key('sha256', text)
+            result = self.result_cache.get(cache_key)
+            if result is not None:
+                self._record('Hash', len(text), started)
+                return result
+        
+        digest = self.hash_bytes(text.encode())
+        with metrics.phase('encode'):
+            result = digest.hex()
+        if cache_key is not None:
+            self.result_cache.put(cache_key, result)
+        return result
+    
+    def hash_bytes(self, data, algorithm='sha256', progress=None):
+        """Raw digest of any bytes-like object; hashlib reads the buffer in place"""
+        started = time.perf_counter_ns()
+        with metrics.phase('cipher'):
+            hasher = hashing.new_hasher(algorithm)
+            view = memoryview(data).cast('B')
+            for start, end in _slices(len(view), progress):
+                hasher.update(view[start:end])
+            digest = hasher.digest()
+        self._record('Hash', memoryview(data).nbytes, started)
+        return digest
+    
+    def hash_stream(self, reader, algorithm='sha256', session=None, final=True):
+        """Hash reader incrementally, optionally resuming or parking a partial state"""
+        started = time.perf_counter_ns()
+        if session:
+            state = self.hash_sessions.take(session)
+            if state is None:
+                raise ValueError("Unknown or expired hash session")
+        else:
+            state = self.hash_sessions.start(algorithm)
+        
+        hasher, algorithm, total = state
+        read = hashing.update_from(hasher, reader)
+        total += read
+        self._record('Hash', read, started)
+        
+        if final:
+            return {'digest': hasher.hexdigest(), 'algorithm': algorithm, 'bytes': total}
+        session = self.hash_sessions.park([hasher, algorithm, total], session)
+        return {'session': session, 'algorithm': algorithm, 'bytes': total}
+    
+    def tree_hash(self, reader, pool, algorithm='sha256', leaf_size=hashing.DEFAULT_LEAF_SIZE,
+                  proof_index=None, window=8):
+        """Merkle root over fixed-size leaves hashed in parallel on pool"""
+        started = time.perf_counter_ns()
+        leaves, total = hashing.tree_leaves(reader, algorithm, leaf_size, pool, window)
+        levels = hashing.tree_levels(leaves, algorithm)
+        self._record('Hash', total, started)
+        
+        result = {
+            'root': levels[-1][0].hex(),
+            'algorithm': algorithm,
+            'scheme': hashing.TREE_SCHEME,
+            'leaf_size': leaf_size,
+            'leaves': len(leaves),
+            'bytes': total
+        }
+        if proof_index is not None:
+            result['index'] = proof_index
+            result['proof'] = hashing.tree_proof(levels, proof_index)
         return result
     
     def generate_key(self, length=16):
-        chars = string.ascii_letters + string.digits + "!@#$%^&*"
-        return ''.join(secrets.choice(chars) for _ in range(length))
+        return self.generate_keys(length)[0]
+    
+    def generate_keys(self, length=16, count=1, charset='default'):
+        """count random keys; the pooled shape is served from the key pool first"""
+        keygen.validate(length, count, charset)
+        keys = self.key_pool.take(count) if self.key_pool.matches(length, charset) else []
+        if len(keys) < count:
+            keys += keygen.generate(length, count - len(keys), charset)
+        return keys
     
     def get_stats(self):
-        if not self.history:
-            return {"message": "No encryption history available"}
-        
-        methods = {}
-        total_chars = 0
+        """Fleet-wide totals merged from every worker - O(workers x methods)"""
+        totals = self.stats.totals()
+        total = sum(entry['count'] for entry in totals.values())
+        if not total:
+            return {
+                "message": "No encryption history available",
+                'key_cache': self.key_cache.stats(),
+                'result_cache': self.result_cache.stats()
+            }
         
-        for entry in self.history:
-            method = entry['method']
-            methods[method] = methods.get(method, 0) + 1
-            total_chars += entry['length']
+        total_chars = sum(entry['chars'] for entry in totals.values())
+        bounds = [f'{bound / 1e6:g}ms' for bound in LATENCY_BOUNDS_NS] + ['+Inf']
+        per_method = {
+            method: {
+                'count': entry['count'],
+                'chars': entry['chars'],
+                'avg_latency_ms': round(entry['latency_ns'] / entry['count'] / 1e6, 3),
+                'latency_histogram': dict(zip(bounds, entry['buckets']))
+            }
+            for method, entry in totals.items() if entry['count']
+        }
         
+        schedules = ciphers.compile_key.cache_info()
         return {
-            'total': len(self.history),
-            'methods': methods,
+            'total': total,
+            'methods': {method: entry['count'] for method, entry in per_method.items()},
             'chars': total_chars,
-            'avg': round(total_chars / len(self.history), 1)
+            'avg': round(total_chars / total, 1),
+            'per_method': per_method,
+            'key_cache': self.key_cache.stats(),
+            'result_cache': self.result_cache.stats(),
+            'schedule_cache': {
+                'size': schedules.currsize,
+                'max_size': schedules.maxsize,
+                'hits': schedules.hits,
+                'misses': schedules.misses
+            }
         }
     
-    def _gen_key(self, password):
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(), 
-            length=32, 
-            salt=b'salt123', 
-            iterations=100000
-        )
-        return base64.urlsafe_b64encode(kdf.derive(password.encode()))
+    def _gen_key(self, password, salt=LEGACY_SALT, kdf_name=LEGACY_KDF[0], params=LEGACY_KDF[1]):
+        # Cache under an HMAC of the password so plaintext passwords never sit in the cache
+        password_hash = hmac.new(self._cache_secret, password.encode(), hashlib.sha256).digest()
+        cache_key = (password_hash, salt, kdf_name, kdf.format_params(params))
+        key = self.key_cache.get(cache_key)
+        if key is not None:
+            return key
+        
+        derived = kdf.get(kdf_name).derive(password.encode(), salt, params)
+        key = base64.urlsafe_b64encode(derived)
+        self.key_cache.put(cache_key, key)
+        return key
+    
+    def _current_salt(self):
+        """Session salt shared by encryptions within SALT_REUSE_SECONDS, then rotated"""
+        salt, expires = self._session_salt
+        now = time.monotonic()
+        if salt is None or now >= expires:
+            salt = secrets.token_bytes(SALT_SIZE)
+            self._session_salt = (salt, now + SALT_REUSE_SECONDS)
+        return salt
+    
+    def _parse_token(self, token):
+        """Return (salt, kdf name, kdf params, fernet token) for any supported token version"""
+        version, sep, body = token.partition('.')
+        if not sep:
+            return (LEGACY_SALT, *LEGACY_KDF, base64.urlsafe_b64decode(token.encode()))
+        if version == 'v2':
+            return (LEGACY_SALT, *LEGACY_KDF, body.encode())
+        if version != 'v3':
+            raise ValueError(f"Unsupported token version: {version}")
+        
+        kdf_name, params, salt, fernet_token = body.split('.', 3)
+        params = kdf.parse_params(kdf_name, params)
+        salt = base64.urlsafe_b64decode(salt + '=' * (-len(salt) % 4))
+        return salt, kdf_name, params, fernet_token.encode()
+    
+    def _stream_key(self, password, salt=None, kdf_name=None, params=None):
+        """AES-GCM key for a stream; no salt means a TXS1 stream keyed from the legacy salt"""
+        # Separate AES-GCM key derived from the Fernet master so the two never share key material
+        from cryptography.hazmat.primitives import hashes
+        from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+        if salt is None:
+            master = base64.urlsafe_b64decode(self._gen_key(password))
+            info = b'text-encrypter stream v1'
+        else:
+            # Every stream has a fresh salt, so caching its key would only evict reusable ones
+            master = kdf.get(kdf_name).derive(password.encode(), salt, params)
+            info = b'text-encrypter stream v2'
+        return HKDF(
+            algorithm=hashes.SHA256(),
+            length=32,
+            salt=None,
+            info=info
+        ).derive(master)
+    
+    def _record(self, method, length, started):
+        self.stats.record(method, length, time.perf_counter_ns() - started)
+
+def _fernet(key):
+    from cryptography.fernet import Fernet
+    return Fernet(key)
+
+def _slices(size, progress=None):
+    """(start, end) windows over size bytes, calling progress(end - start) after each
     
-    def _add_history(self, method, length):
-        self.history.append({
-            'method': method, 
-            'length': length, 
-            'time': time.time()
-        })
+    Without progress the whole range is one window. progress may raise
+    (jobs.Cancelled) to stop the work between windows.
+    """
+    if progress is None:
+        yield 0, size
+        return
+    for start in range(0, size, PROGRESS_WINDOW):
+        end = min(start + PROGRESS_WINDOW, size)
+        yield start, end
+        progress(end - start)
+
+def _output_views(data, out):
+    """Byte views of data and of out (a new bytearray when None), plus the object to return"""
+    view = memoryview(data).cast('B')
+    if out is None:
+        out = bytearray(len(view))
+    target = memoryview(out).cast('B')
+    if len(target) < len(view):
+        raise ValueError("Output buffer is too small")
+    return view, out, target
 
 # Initialize crypto engine
 crypto = CryptoEngine()
+batch_pool = ThreadPoolExecutor(max_workers=BATCH_WORKERS)
+job_queue = jobs.Jobs(
+    max_workers=int(os.environ.get('JOB_WORKERS', 2)),
+    max_pending=int(os.environ.get('JOB_QUEUE', 16)),
+    ttl=float(os.environ.get('JOB_TTL', 600)),
+    max_retained=int(os.environ.get('JOB_RETAIN', 64)),
+    max_retained_bytes=int(os.environ.get('JOB_RETAIN_BYTES', 256 * 1024 * 1024))
+)
+offloader = offload.Offloader(
+    crypto,
+    max_workers=int(os.environ.get('OFFLOAD_WORKERS', 0)),
+    max_queue=int(os.environ['OFFLOAD_QUEUE']) if os.environ.get('OFFLOAD_QUEUE') else None,
+    timeout=float(os.environ.get('OFFLOAD_TIMEOUT', 30))
+)
+
+def crypto_call(method, *args):
+    return getattr(crypto, method)(*args)
+
+# Modules the app imports on first use rather than at start-up. cryptography (here, in kdf
+# and in stream_cipher) and multiprocessing (in offload) are imported inside the functions
+# that need them, which keeps them off every worker's start-up path; warmup() loads them
+# ahead of time instead.
+LAZY_IMPORTS = (
+    'cryptography.fernet',
+    'cryptography.hazmat.primitives.kdf.hkdf',
+    'cryptography.hazmat.primitives.kdf.pbkdf2',
+    'cryptography.hazmat.primitives.kdf.scrypt',
+    'cryptography.hazmat.primitives.ciphers.aead',
+    'concurrent.futures.process'
+)
+
+def warmup(password='defaultpass'):
+    """Do the first-use work now and return the milliseconds each step took
+    
+    Loads the lazy imports (and NumPy when installed), compiles the default
+    key schedules and charset tables, parses the page template, and derives
+    password's keys into the key cache. Under gunicorn --preload with
+    WARMUP=1 this runs once in the master and every forked worker starts
+    warm. It starts no threads or processes, as those would not survive
+    the fork, and records no statistics.
+    """
+    timings = {}
+    started = time.perf_counter()
+    
+    def done(step):
+        nonlocal started
+        now = time.perf_counter()
+        timings[step] = round((now - started) * 1000, 2)
+        started = now
+    
+    for name in LAZY_IMPORTS:
+        importlib.import_module(name)
+    done('imports')
+    if ciphers.HAVE_NUMPY:
+        ciphers.load_numpy()
+        done('numpy')
+    for cipher in ciphers.CIPHERS:
+        ciphers.compile_key(cipher, password)
+        ciphers.compile_key(cipher, password, decrypt=True)
+    keygen.generate()   # builds the default charset table
+    done('tables')
+    app.jinja_env.get_template('index.html')
+    done('templates')
+    # The legacy-salt key serves streams and old tokens; the session-salt key serves new encryptions
+    crypto._gen_key(password)
+    crypto._gen_key(password, crypto._current_salt(), DEFAULT_KDF, crypto.kdf_params[DEFAULT_KDF])
+    done('key_cache')
+    return timings
+
+if os.environ.get('WARMUP'):
+    warmup()
 
 @app.route('/')
 def index():
     return render_template('index.html')
 
-@app.route('/process', methods=['POST'])
-def process():
-    data = request.json
+def process_item(data, offload_heavy=True):
+    """Run one /process request body and return the response payload
+    
+    Fernet and large hashes go through the offloader when offload_heavy is set;
+    this raises offload.Saturated when its queue is full.
+    """
     text = data.get('text', '').strip()
     method = data.get('method', 'caesar')
     password = data.get('password', 'defaultpass')
     action = data.get('action', 'encrypt')
+    kdf_name = data.get('kdf')
     
     if not text:
-        return jsonify({'error': 'Please enter some text to process'})
+        return {'error': 'Please enter some text to process'}
+    if kdf_name is not None and kdf_name not in kdf.KDFS:
+        return {'error': f"Unknown key derivation '{kdf_name}'"}
+    
+    try:
+        shift = int(data.get('shift', 3))
+    except (TypeError, ValueError, OverflowError):
+        return {'error': 'Shift must be a whole number'}
+    
+    heavy = offloader.run if offload_heavy else crypto_call
     
     try:
         if action == 'encrypt':
             if method == 'caesar':
-                result = crypto.caesar_cipher(text)
+                result = crypto.caesar_cipher(text, shift)
+            elif method in ciphers.CIPHERS:
+                result = crypto.polyalphabetic_cipher(method, text, password)
             elif method == 'fernet':
-                result = crypto.fernet_encrypt(text, password)
+                result = heavy('fernet_encrypt', text, password, kdf_name)
             elif method == 'hash':
-                result = crypto.hash_encrypt(text)
+                if len(text) >= OFFLOAD_HASH_CHARS:
+                    result = heavy('hash_encrypt', text)
+                else:
+                    result = crypto.hash_encrypt(text)
             else:
-                return jsonify({'error': 'Invalid encryption method'})
+                return {'error': 'Invalid encryption method'}
         else:  # decrypt
             if method == 'caesar':
-                result = crypto.caesar_cipher(text, decrypt=True)
+                result = crypto.caesar_cipher(text, shift, decrypt=True)
+            elif method in ciphers.CIPHERS:
+                result = crypto.polyalphabetic_cipher(method, text, password, decrypt=True)
             elif method == 'fernet':
-                result = crypto.fernet_decrypt(text, password)
+                result = heavy('fernet_decrypt', text, password)
             else:
-                return jsonify({'error': 'Hash values cannot be decrypted'})
+                return {'error': 'Hash values cannot be decrypted'}
         
-        return jsonify({
+        return {
             'result': result,
             'method': method,
             'action': action,
             'length': len(result)
-        })
+        }
         
+    except offload.Saturated:
+        raise
     except Exception as e:
-        return jsonify({'error': f'Processing failed: {str(e)}'})
+        return {'error': f'Processing failed: {str(e)}'}
+
+def process_binary(data, offload_heavy=True, progress=None):
+    """process_item for a binary body, where data['data'] is a bytearray
+    
+    Results are bytes (ciphertext, plaintext, Fernet token or raw digest).
+    The classical ciphers overwrite the payload in place and shift ASCII
+    letters only. progress is passed on to the engine for background jobs;
+    a Fernet payload is one step, reported when it completes.
+    """
+    payload = data.get('data')
+    method = data.get('method', 'caesar')
+    password = data.get('password', 'defaultpass')
+    action = data.get('action', 'encrypt')
+    kdf_name = data.get('kdf')
+    
+    if not payload:
+        return {'error': 'Please enter some text to process'}
+    if kdf_name is not None and kdf_name not in kdf.KDFS:
+        return {'error': f"Unknown key derivation '{kdf_name}'"}
+    
+    try:
+        shift = int(data.get('shift', 3))
+    except (TypeError, ValueError, OverflowError):
+        return {'error': 'Shift must be a whole number'}
+    
+    heavy = offloader.run if offload_heavy and progress is None else crypto_call
+    decrypt = action != 'encrypt'
+    
+    try:
+        if method == 'caesar':
+            result = crypto.caesar_bytes(payload, shift, decrypt, out=payload, progress=progress)
+        elif method in ciphers.CIPHERS:
+            result = crypto.polyalphabetic_bytes(method, payload, password, decrypt, out=payload,
+                                                 progress=progress)
+        elif method == 'fernet' and decrypt:
+            try:
+                result = heavy('fernet_decrypt_bytes', payload, password)
+            except offload.Saturated:
+                raise
+            except Exception:
+                return {'error': 'Wrong password entered'}
+        elif method == 'fernet':
+            result = heavy('fernet_encrypt_bytes', payload, password, kdf_name)
+        elif decrypt:
+            return {'error': 'Hash values cannot be decrypted'}
+        elif method == 'hash':
+            if len(payload) >= OFFLOAD_HASH_CHARS and heavy is not crypto_call:
+                result = heavy('hash_bytes', payload)
+            else:
+                result = crypto.hash_bytes(payload, progress=progress)
+        else:
+            return {'error': 'Invalid encryption method'}
+        
+        if method == 'fernet' and progress is not None:
+            progress(len(payload))
+        return {
+            'result': result,
+            'method': method,
+            'action': action,
+            'length': len(result)
+        }
+    
+    except (offload.Saturated, jobs.Cancelled):
+        raise
+    except Exception as e:
+        return {'error': f'Processing failed: {str(e)}'}
+
+def _safe_process_item(data):
+    try:
+        if not isinstance(data, dict):
+            return {'error': 'Each item must be a JSON object'}
+        # Batches already spread work over their own pool
+        return process_item(data, offload_heavy=False)
+    except Exception as e:
+        return {'error': f'Processing failed: {str(e)}'}
+
+def _process_group(indexed_items):
+    return [(i, _safe_process_item(item)) for i, item in indexed_items]
+
+def process_batch(items):
+    """Process many items, keeping input order and one error slot per item.
+    
+    Fernet items are grouped by password so each group derives its key once,
+    and groups plus large texts run on the shared batch pool; the rest run inline.
+    """
+    results = [None] * len(items)
+    fernet_groups = {}
+    heavy = []
+    
+    for i, item in enumerate(items):
+        if isinstance(item, dict) and item.get('method') == 'fernet':
+            password = item.get('password', 'defaultpass')
+            if not isinstance(password, str):
+                results[i] = {'error': 'Password must be a string'}
+                continue
+            fernet_groups.setdefault(str(password), []).append((i, item))
+        elif isinstance(item, dict) and len(str(item.get('text', ''))) >= BATCH_HEAVY_CHARS:
+            heavy.append([(i, item)])
+        else:
+            results[i] = _safe_process_item(item)
+    
+    tasks = list(fernet_groups.values()) + heavy
+    for group in batch_pool.map(_process_group, tasks):
+        for i, result in group:
+            results[i] = result
+    return results
+
+def _busy(error):
+    response = jsonify({'error': 'Server is busy, please retry shortly'})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+def _read_binary_request():
+    """Request fields for an octet-stream body (options in the query string) or a framed body"""
+    if request.content_length is not None and request.content_length > MAX_BINARY_BYTES:
+        raise ValueError(f"Payload limited to {MAX_BINARY_BYTES} bytes")
+    if request.mimetype == frames.CONTENT_TYPE:
+        fields = frames.read_fields(request.stream, MAX_BINARY_BYTES)
+        data = {name: value.decode() for name, value in fields.items() if name != 'data'}
+        data['data'] = fields.get('data')
+        return data
+    
+    data = request.args.to_dict()
+    data['password'] = request.headers.get('X-Password', 'defaultpass')
+    data['data'] = frames.read_body(request.stream, request.content_length, MAX_BINARY_BYTES)
+    return data
+
+def _negotiate(payload, preferred='application/json'):
+    """Serialize payload as JSON, raw bytes or frames, following the Accept header
+    
+    preferred is used when the client states no preference.
+    """
+    offers = ['application/json', 'application/octet-stream', frames.CONTENT_TYPE]
+    offers.remove(preferred)
+    offers.insert(0, preferred)
+    best = request.accept_mimetypes.best_match(offers, default=preferred)
+    
+    result = payload.get('result')
+    if best == frames.CONTENT_TYPE:
+        return Response(frames.encode(payload), mimetype=best)
+    if best == 'application/octet-stream' and result is not None:
+        return Response(result.encode() if isinstance(result, str) else bytes(result), mimetype=best)
+    if isinstance(result, (bytes, bytearray)):
+        if payload['method'] == 'hash':
+            payload = dict(payload, result=result.hex())
+        else:
+            try:
+                payload = dict(payload, result=result.decode())
+            except UnicodeDecodeError:
+                return jsonify({'error': 'Result is not UTF-8 text; accept application/octet-stream'})
+    return jsonify(payload)
+
+@app.route('/process', methods=['POST'])
+def process():
+    metrics.begin()
+    try:
+        binary = request.mimetype in BINARY_TYPES
+        try:
+            with metrics.phase('parse'):
+                data = _read_binary_request() if binary else request.json
+        except ValueError as e:
+            return jsonify({'error': f'Invalid request body: {str(e)}'})
+        try:
+            payload = process_binary(data) if binary else process_item(data)
+        except offload.Saturated as e:
+            return _busy(e)
+        with metrics.phase('serialize'):
+            response = _negotiate(payload, request.mimetype if binary else 'application/json')
+        
+        # Only known labels are exported so client input cannot blow up metric cardinality
+        method = data.get('method', 'caesar') if isinstance(data, dict) else None
+        action = data.get('action', 'encrypt') if isinstance(data, dict) else None
+        metrics.finish(
+            method if method in METHODS else 'other',
+            'encrypt' if action == 'encrypt' else 'decrypt'
+        )
+        return response
+    finally:
+        # Early returns and errors (a 415 from request.json included) leave the scope open
+        metrics.abort()
+
+@app.route('/process/batch', methods=['POST'])
+def process_batch_route():
+    data = request.json
+    items = data.get('items') if isinstance(data, dict) else data
+    
+    if not isinstance(items, list):
+        return jsonify({'error': 'Expected a list of items'})
+    if len(items) > MAX_BATCH_ITEMS:
+        return jsonify({'error': f'Batch limited to {MAX_BATCH_ITEMS} items'})
+    
+    try:
+        results = process_batch(items)
+        return jsonify({'results': results, 'count': len(results)})
+    except Exception as e:
+        return jsonify({'error': f'Batch processing failed: {str(e)}'})
+
+def _stream_request():
+    """Return (reader, filename, password, chunk_size) for an upload or raw request body
+    
+    Only multipart bodies are parsed as forms. Any other body is read raw, whatever its
+    type, because parsing it (curl --data-binary sends form-urlencoded) would consume it.
+    """
+    password = request.headers.get('X-Password', 'defaultpass')
+    if request.mimetype == 'multipart/form-data':
+        upload = request.files.get('file')
+        if upload is None:
+            raise ValueError("Multipart uploads need a 'file' field")
+        reader, filename = upload.stream, upload.filename or 'upload'
+        password = request.form.get('password') or password
+    else:
+        reader, filename = request.stream, 'data'
+    chunk_size = int(request.args.get('chunk_size', stream_cipher.DEFAULT_CHUNK_SIZE))
+    return reader, filename, password, chunk_size
+
+def _download(generator, filename):
+    return Response(
+        stream_with_context(generator),
+        mimetype='application/octet-stream',
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
+@app.route('/stream/encrypt', methods=['POST'])
+def stream_encrypt():
+    try:
+        reader, filename, password, chunk_size = _stream_request()
+        segments = crypto.stream_encrypt(reader, password, chunk_size)
+        # Pull the header eagerly so bad parameters are reported before streaming starts
+        header = next(segments)
+    except Exception as e:
+        return jsonify({'error': f'Stream encryption failed: {str(e)}'})
+    
+    def generate():
+        yield header
+        yield from segments
+    return _download(generate(), filename + '.enc')
+
+@app.route('/stream/decrypt', methods=['POST'])
+def stream_decrypt():
+    try:
+        reader, filename, password, _ = _stream_request()
+        chunks = crypto.stream_decrypt(reader, password)
+        first = next(chunks)
+    except stream_cipher.StreamError as e:
+        return jsonify({'error': str(e)})
+    except Exception as e:
+        return jsonify({'error': f'Stream decryption failed: {str(e)}'})
+    
+    def generate():
+        yield first
+        yield from chunks
+    if filename.endswith('.enc'):
+        filename = filename[:-4]
+    return _download(generate(), filename)
+
+@app.route('/hash/stream', methods=['POST'])
+def hash_stream():
+    try:
+        result = crypto.hash_stream(
+            request.stream,
+            request.args.get('algorithm', 'sha256'),
+            request.args.get('session'),
+            request.args.get('final', '1') != '0'
+        )
+        return jsonify(result)
+    except ValueError as e:
+        return jsonify({'error': str(e)})
+    except Exception as e:
+        return jsonify({'error': f'Hashing failed: {str(e)}'})
+
+@app.route('/hash/tree', methods=['POST'])
+def hash_tree():
+    try:
+        proof = request.args.get('proof')
+        result = crypto.tree_hash(
+            request.stream,
+            batch_pool,
+            request.args.get('algorithm', 'sha256'),
+            int(request.args.get('leaf_size', hashing.DEFAULT_LEAF_SIZE)),
+            int(proof) if proof is not None else None,
+            window=2 * BATCH_WORKERS
+        )
+        return jsonify(result)
+    except ValueError as e:
+        return jsonify({'error': str(e)})
+    except Exception as e:
+        return jsonify({'error': f'Tree hashing failed: {str(e)}'})
+
+@app.route('/hash/tree/verify', methods=['POST'])
+def hash_tree_verify():
+    """Check one leaf chunk (request body) against a root using its audit path"""
+    try:
+        proof = request.args.get('proof', '')
+        valid = hashing.verify_leaf(
+            request.get_data(),
+            proof.split(',') if proof else [],
+            request.args['root'],
+            request.args.get('algorithm', 'sha256')
+        )
+        return jsonify({'valid': valid})
+    except (KeyError, ValueError) as e:
+        return jsonify({'error': f'Invalid verification request: {str(e)}'})
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """Queue a /process request (JSON or binary body) and return its job status"""
+    binary = request.mimetype in BINARY_TYPES
+    try:
+        if binary:
+            data = _read_binary_request()
+        else:
+            data = request.json
+            if not isinstance(data, dict):
+                raise ValueError("Expected a JSON object")
+            text = str(data.get('text', '')).strip()
+            data = dict(data, text=text, data=bytearray(text.encode()))
+    except ValueError as e:
+        return jsonify({'error': f'Invalid request body: {str(e)}'})
+    if not data.get('data'):
+        return jsonify({'error': 'Please enter some text to process'})
+    
+    size = len(data['data'])
+    if not binary and data.get('method', 'caesar') in ('caesar',) + ciphers.CIPHERS:
+        # The str engine, as /process uses for JSON, so non-ASCII letters fold the same way;
+        # it reports progress in one step once the text is done
+        def work(progress):
+            result = process_item(data, offload_heavy=False)
+            progress(size)
+            return result
+    else:
+        # Everything else runs on the bytes engine so it can report progress
+        def work(progress):
+            return process_binary(data, progress=progress)
+    
+    try:
+        job = job_queue.submit(
+            work,
+            size,
+            method=str(data.get('method', 'caesar')),
+            action=str(data.get('action', 'encrypt')),
+            format=request.mimetype if binary else 'application/json'
+        )
+    except jobs.Full as e:
+        return _busy(e)
+    return jsonify(job.status())
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown or expired job'})
+    return jsonify(job.status())
+
+@app.route('/jobs/<job_id>/result')
+def job_result(job_id):
+    """The finished job's payload, negotiated like /process"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown or expired job'})
+    if job.state != 'done':
+        return jsonify({'error': job.error or f'Job is {job.state}', 'state': job.state})
+    return _negotiate(job.result, job.info['format'])
+
+@app.route('/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """Cancel a queued or running job, or discard a finished one"""
+    job = job_queue.cancel(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown or expired job'})
+    return jsonify(job.status())
 
 @app.route('/generate-key')
 def generate_key():
     try:
-        key = crypto.generate_key()
-        return jsonify({'key': key})
+        length = int(request.args.get('length', 16))
+        count = int(request.args.get('count', 1))
+    except ValueError:
+        return jsonify({'error': 'Length and count must be whole numbers'})
+    
+    try:
+        keys = crypto.generate_keys(length, count, request.args.get('charset', 'default'))
+        # The shape follows the request, so ?count=1 still gets a list
+        if 'count' not in request.args:
+            return jsonify({'key': keys[0]})
+        return jsonify({'keys': keys, 'count': len(keys)})
+    except ValueError as e:
+        return jsonify({'error': str(e)})
     except Exception as e:
         return jsonify({'error': f'Key generation failed: {str(e)}'})
 
 @app.route('/stats')
 def stats():
     try:
-        return jsonify(crypto.get_stats())
+        stats = crypto.get_stats()
+        stats['offload'] = offloader.stats()
+        stats['jobs'] = job_queue.stats()
+        stats['key_pool'] = crypto.key_pool.stats()
+        return jsonify(stats)
     except Exception as e:
         return jsonify({'error': f'Stats unavailable: {str(e)}'})
 
+@app.route('/metrics')
+def metrics_route():
+    return Response(
+        metrics.render(crypto.stats.totals()),
+        mimetype='text/plain; version=0.0.4'
+    )
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
     app.run(debug=False, host='0.0.0.0', port=port)
\ No newline at end of file
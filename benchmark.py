@@ -0,0 +1,277 @@
+"""
+Performance Benchmarks for Text Encrypter
+Compares the table-driven Caesar engine with the original per-character loop,
+and the pure-Python and NumPy polyalphabetic engines, then times the real
+CryptoEngine methods and the /process route across payload sizes
+
+    python benchmark.py --json run.json                 # sizes up to 1 MB
+    python benchmark.py --full --baseline run.json      # up to 100 MB, compared to a stored run
+
+Suite timings use perf_counter_ns with warmup calls and repeated runs, and
+report percentiles. With --baseline, any case whose median slowed past
+--threshold is a regression, and the exit status is 1.
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+import ciphers
+
+SIZES = {
+    '1 KB': 1024,
+    '1 MB': 1024 ** 2,
+    '100 MB': 100 * 1024 ** 2
+}
+
+SUITE_SIZES = {
+    '10 B': 10,
+    '1 KB': 1024,
+    '64 KB': 64 * 1024,
+    '1 MB': 1024 ** 2,
+    '10 MB': 10 * 1024 ** 2,
+    '100 MB': 100 * 1024 ** 2
+}
+
+SAMPLE = "The Quick Brown Fox jumps over the lazy dog, 1234567890! "
+
+
+def reference_caesar(text, shift=3):
+    """Original character-by-character implementation kept for comparison"""
+    result = ""
+    for char in text:
+        if char.isalpha():
+            base = 65 if char.isupper() else 97
+            result += chr((ord(char) - base + shift) % 26 + base)
+        else:
+            result += char
+    return result
+
+
+def make_text(size):
+    """Build a mixed-case ASCII payload of exactly size characters"""
+    return (SAMPLE * (size // len(SAMPLE) + 1))[:size]
+
+
+def time_call(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def percentile(ordered, q):
+    """Nearest-rank percentile of an already sorted list"""
+    index = max(0, min(len(ordered) - 1, math.ceil(q / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def measure(func, *args, warmup=2, repeat=20, budget=2.0):
+    """Time func(*args) with perf_counter_ns after warmup calls.
+
+    Runs up to repeat times but stops once budget seconds have been spent,
+    after at least three runs. Returns timing statistics in nanoseconds.
+    """
+    for _ in range(warmup):
+        func(*args)
+    samples = []
+    deadline = time.perf_counter_ns() + int(budget * 1e9)
+    while len(samples) < repeat and (len(samples) < 3 or time.perf_counter_ns() < deadline):
+        start = time.perf_counter_ns()
+        func(*args)
+        samples.append(time.perf_counter_ns() - start)
+    samples.sort()
+    return {
+        'runs': len(samples),
+        'min_ns': samples[0],
+        'p50_ns': percentile(samples, 50),
+        'p90_ns': percentile(samples, 90),
+        'p99_ns': percentile(samples, 99),
+        'max_ns': samples[-1],
+        'mean_ns': sum(samples) // len(samples)
+    }
+
+
+def bench_caesar(reference_limit):
+    """Time both Caesar engines at 1 KB, 1 MB and 100 MB"""
+    print("🔒 CAESAR: loop vs str.translate")
+    print("-" * 60)
+    print(f"  {'Size':>8} {'Loop':>12} {'Translate':>12} {'Speedup':>10} {'MB/s':>10}")
+
+    for label, size in SIZES.items():
+        text = make_text(size)
+        fast = time_call(ciphers.caesar, text, 3)
+        rate = size / fast / 1024 ** 2 if fast else float('inf')
+
+        if size <= reference_limit:
+            assert ciphers.caesar(text, 3) == reference_caesar(text, 3)
+            slow = time_call(reference_caesar, text, 3)
+            print(f"  {label:>8} {slow:>11.4f}s {fast:>11.4f}s {slow / fast:>9.1f}x {rate:>10.1f}")
+        else:
+            print(f"  {label:>8} {'skipped':>12} {fast:>11.4f}s {'-':>10} {rate:>10.1f}")
+    print()
+
+
+def bench_shift_engines():
+    """Time shift_letters on each engine for a single shift and a 5-letter key"""
+    print("🧮 SHIFT ENGINES: python vs numpy")
+    print("-" * 60)
+    engines = ['python'] + (['numpy'] if ciphers.HAVE_NUMPY else [])
+    if not ciphers.HAVE_NUMPY:
+        print("  NumPy not installed - only the pure-Python engine is timed")
+
+    for label, size in SIZES.items():
+        text = make_text(size)
+        for key in ([3], [1, 4, 7, 11, 2]):
+            timings = []
+            for engine in engines:
+                elapsed = time_call(ciphers.shift_letters, text, key, engine)
+                timings.append(f"{engine} {size / elapsed / 1024 ** 2:>8.1f} MB/s")
+            print(f"  {label:>8} key={len(key)}  " + "  ".join(timings))
+    print()
+
+
+def suite_cases(max_size):
+    """Yield (name, size label, size, callable) for every engine method and route at each size
+
+    Inputs are built one size at a time as the cases are consumed, so the
+    large texts and tokens of one size are gone before the next is timed.
+    """
+    # The engine is imported here so main() can isolate its stats and caches first
+    import app
+
+    crypto = app.crypto
+    client = app.app.test_client()
+    yield 'generate_key', '16 chars', 16, lambda: crypto.generate_key()
+    yield 'generate_keys', '1000 x 16', 16000, lambda: crypto.generate_keys(16, 1000)
+    yield 'get_stats', '-', 0, crypto.get_stats
+    for label, size in SUITE_SIZES.items():
+        if size > max_size:
+            continue
+        text = make_text(size)
+        yield 'caesar', label, size, lambda: crypto.caesar_cipher(text, 3)
+        yield 'vigenere', label, size, lambda: crypto.polyalphabetic_cipher('vigenere', text, 'LEMON')
+        yield 'fernet_encrypt', label, size, lambda: crypto.fernet_encrypt(text, 'benchpass')
+        token = crypto.fernet_encrypt(text, 'benchpass')
+        yield 'fernet_decrypt', label, size, lambda: crypto.fernet_decrypt(token, 'benchpass')
+        token = None
+        yield 'hash', label, size, lambda: crypto.hash_encrypt(text)
+        for method in ('caesar', 'fernet', 'hash'):
+            body = {'text': text, 'method': method, 'password': 'benchpass'}
+            yield f'/process {method}', label, size, lambda: client.post('/process', json=body)
+        body = text = None
+
+
+def bench_suite(max_size, repeat, budget):
+    """Time every suite case; returns {name: {size label: stats}}"""
+    print("📏 ENGINE SUITE: perf_counter_ns percentiles")
+    print("-" * 78)
+    print(f"  {'Case':<18} {'Size':>9} {'Runs':>5} {'p50':>11} {'p90':>11} {'p99':>11} {'MB/s':>9}")
+    results = {}
+    for name, label, size, func in suite_cases(max_size):
+        stats = measure(func, warmup=1 if size >= SUITE_SIZES['10 MB'] else 2, repeat=repeat, budget=budget)
+        stats['bytes'] = size
+        if size:
+            stats['mb_per_s'] = round(size / (stats['p50_ns'] / 1e9) / 1024 ** 2, 2)
+        results.setdefault(name, {})[label] = stats
+        print(f"  {name:<18} {label:>9} {stats['runs']:>5} {_format_ns(stats['p50_ns']):>11} "
+              f"{_format_ns(stats['p90_ns']):>11} {_format_ns(stats['p99_ns']):>11} "
+              f"{stats.get('mb_per_s', '-'):>9}")
+    print()
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Print the median change per case against a baseline; returns the regressed cases"""
+    print(f"📉 BASELINE COMPARISON (regression above +{threshold:.0%} on p50)")
+    print("-" * 60)
+    regressions = []
+    for name, sizes in results.items():
+        for label, stats in sizes.items():
+            before = baseline.get(name, {}).get(label)
+            if not before:
+                continue
+            change = stats['p50_ns'] / before['p50_ns'] - 1
+            flag = '❌' if change > threshold else '✅'
+            if change > threshold:
+                regressions.append(f'{name} @ {label}')
+            print(f"  {flag} {name:<18} {label:>9} {_format_ns(before['p50_ns']):>11} -> "
+                  f"{_format_ns(stats['p50_ns']):>11} ({change:+.1%})")
+    print()
+    return regressions
+
+
+def _format_ns(ns):
+    for unit, scale in (('s', 1e9), ('ms', 1e6), ('us', 1e3)):
+        if ns >= scale:
+            return f"{ns / scale:.2f} {unit}"
+    return f"{ns} ns"
+
+
+def run(args):
+    """Benchmarks, then the optional JSON report and baseline comparison"""
+    max_size = SIZES['100 MB'] if args.full else SIZES['1 MB']
+    bench_caesar(max_size)
+    bench_shift_engines()
+    results = bench_suite(max_size, args.repeat, args.budget)
+
+    if args.json:
+        report = {
+            'meta': {
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'cpus': os.cpu_count(),
+                'numpy': ciphers.HAVE_NUMPY,
+                'max_size': max_size,
+                'timestamp': int(time.time())
+            },
+            'results': results
+        }
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Results written to {args.json}\n")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"❌ {len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+        print("✅ No regressions against the baseline")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Text Encrypter benchmarks")
+    parser.add_argument('--full', action='store_true',
+                        help="also run the slow reference loop and suite sizes up to 100 MB")
+    parser.add_argument('--repeat', type=int, default=20, help="maximum timed runs per suite case")
+    parser.add_argument('--budget', type=float, default=2.0, help="seconds per suite case")
+    parser.add_argument('--json', metavar='PATH', help="write suite results to PATH")
+    parser.add_argument('--baseline', metavar='PATH', help="compare suite results with a stored run")
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help="allowed median slowdown against the baseline (default 0.10)")
+    parser.add_argument('--with-cache', action='store_true',
+                        help="keep the result cache on (by default repeated inputs would only time cache hits)")
+    args = parser.parse_args()
+
+    # Keep benchmark runs out of the server's shared stats and result cache
+    stats_dir = None
+    if not os.environ.get('STATS_DIR'):
+        stats_dir = os.environ['STATS_DIR'] = tempfile.mkdtemp(prefix='text-encrypter-bench-')
+    if not args.with_cache:
+        os.environ['RESULT_CACHE_BYTES'] = '0'
+    try:
+        run(args)
+    finally:
+        if stats_dir:
+            shutil.rmtree(stats_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""
+In-process caches for the Text Encrypter engine
+Bounded LRU structures shared by CryptoEngine
+"""
+
+from collections import OrderedDict
+import hashlib
+import os
+import threading
+import time
+
+
+class KeyCache:
+    """LRU cache of derived keys, bounded by entry count and TTL.
+
+    Keys are held in bytearrays that are zeroed when an entry is evicted,
+    expires or the cache is cleared.
+    """
+
+    def __init__(self, max_size=128, ttl=300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()   # cache key -> (bytearray, expiry)
+        self._lock = threading.Lock()
+
+    def get(self, cache_key):
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is None:
+                self.misses += 1
+                return None
+            buf, expires = entry
+            if expires <= time.monotonic():
+                self._drop(cache_key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(cache_key)
+            self.hits += 1
+            return bytes(buf)
+
+    def put(self, cache_key, key):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            if cache_key in self._entries:
+                self._wipe(self._entries.pop(cache_key)[0])
+            self._entries[cache_key] = (bytearray(key), time.monotonic() + self.ttl)
+            while len(self._entries) > self.max_size:
+                self._drop(next(iter(self._entries)))
+
+    def clear(self):
+        with self._lock:
+            for buf, _ in self._entries.values():
+                self._wipe(buf)
+            self._entries.clear()
+
+    def stats(self):
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions
+        }
+
+    def _drop(self, cache_key):
+        buf, _ = self._entries.pop(cache_key)
+        self._wipe(buf)
+        self.evictions += 1
+
+    @staticmethod
+    def _wipe(buf):
+        buf[:] = bytes(len(buf))
+
+
+class ResultCache:
+    """Content-addressed LRU cache for deterministic results, bounded by bytes.
+
+    Entries are keyed by a BLAKE2b digest of the operation and its input.
+    With a directory set, results are also written there so they survive
+    worker restarts and are shared between workers.
+    """
+
+    def __init__(self, max_bytes=32 * 1024 * 1024, max_item=64 * 1024, directory=None,
+                 max_disk_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.max_item = max_item
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self.size = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()   # digest -> result
+        self._lock = threading.Lock()
+        self._disk_writes = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def key(self, *parts):
+        """Digest of the operation parts; the last part is the (possibly large) input text"""
+        *labels, text = parts
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update('\0'.join(str(label) for label in labels).encode() + b'\0')
+        digest.update(text.encode('utf-8', 'surrogatepass'))
+        return digest.hexdigest()
+
+    def cacheable(self, text):
+        return self.enabled and len(text) <= self.max_item
+
+    def get(self, key):
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return result
+
+        result = self._read_disk(key)
+        with self._lock:
+            if result is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._store(key, result)
+        return result
+
+    def put(self, key, result):
+        with self._lock:
+            self._store(key, result)
+        self._write_disk(key, result)
+
+    def stats(self):
+        return {
+            'bytes': self.size,
+            'max_bytes': self.max_bytes,
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'disk': bool(self.directory)
+        }
+
+    def _store(self, key, result):
+        if key in self._entries:
+            return
+        self._entries[key] = result
+        self.size += len(result)
+        while self.size > self.max_bytes and self._entries:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= len(evicted)
+            self.evictions += 1
+
+    def _read_disk(self, key):
+        if not self.directory:
+            return None
+        try:
+            with open(os.path.join(self.directory, key), 'rb') as f:
+                return f.read().decode('utf-8', 'surrogatepass')
+        except OSError:
+            return None
+
+    def _write_disk(self, key, result):
+        if not self.directory:
+            return
+        path = os.path.join(self.directory, key)
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(result.encode('utf-8', 'surrogatepass'))
+            os.replace(tmp_path, path)
+        except OSError:
+            return
+        self._disk_writes += 1
+        if self._disk_writes % 256 == 0:
+            self._prune_disk()
+
+    def _prune_disk(self):
+        """Delete the oldest files until the directory fits max_disk_bytes"""
+        try:
+            entries = [entry for entry in os.scandir(self.directory) if entry.is_file()]
+            files = sorted((entry.stat().st_mtime, entry.stat().st_size, entry.path) for entry in entries)
+        except OSError:
+            return
+        total = sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
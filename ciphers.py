@@ -0,0 +1,352 @@
+"""
+Classical cipher engines for Text Encrypter
+Table-driven implementations built once at import time, with an optional
+NumPy engine for bulk ASCII data
+
+Every cipher also has a bytes-level form that takes any buffer-protocol
+object (bytes, bytearray, memoryview, mmap), shifts ASCII letters only and
+can write into a caller-supplied buffer, including the input itself.
+
+The polyalphabetic family (Vigenere, Beaufort, autokey) compiles each key
+into a KeySchedule of per-position translation tables. compile_key caches
+schedules, so a run of messages under one key only pays for table passes.
+"""
+
+from functools import lru_cache
+from importlib.util import find_spec
+from itertools import accumulate, chain
+from operator import attrgetter
+import re
+import string
+
+# NumPy is optional (the pure-Python engine covers everything) and is the
+# slowest import in the app, so only its presence is checked here; the
+# module itself is imported by load_numpy() on the first large input
+HAVE_NUMPY = find_spec('numpy') is not None
+np = None
+
+# Below this size the NumPy setup cost outweighs its throughput
+NUMPY_MIN_CHARS = 64 * 1024
+NUMPY_BLOCK = 1024 * 1024
+BYTES_BLOCK = 1024 * 1024
+
+CIPHERS = ('vigenere', 'beaufort', 'autokey')
+MAX_KEY_LETTERS = 4096
+
+_LETTER_RUNS = re.compile(r'([A-Za-z]+)')
+_NON_LETTERS = re.compile(r'[^A-Za-z]+')
+_NON_LETTER_BYTES = bytes(b for b in range(256) if not (65 <= b <= 90 or 97 <= b <= 122))
+
+
+class _ShiftTable(dict):
+    """str.translate table for one Caesar shift.
+
+    ASCII letters are filled in up front; other characters are resolved on
+    first sight with the same rule the original per-character loop used.
+    """
+
+    # Stop memoizing rare characters past this size so hostile input cannot grow the table forever
+    MAX_ENTRIES = 4096
+
+    def __init__(self, shift):
+        super().__init__()
+        self.shift = shift
+        for base in (65, 97):
+            for i in range(26):
+                self[base + i] = chr((i + shift) % 26 + base)
+
+    def __missing__(self, code):
+        char = chr(code)
+        if char.isalpha():
+            base = 65 if char.isupper() else 97
+            mapped = chr((code - base + self.shift) % 26 + base)
+        else:
+            mapped = char
+        if len(self) < self.MAX_ENTRIES:
+            self[code] = mapped
+        return mapped
+
+
+# One table per shift; decryption by s reuses the table for -s
+CAESAR_TABLES = tuple(_ShiftTable(shift) for shift in range(26))
+
+# ASCII-letters-only tables for the polyalphabetic ciphers, which leave other characters alone
+ASCII_TABLES = tuple(
+    str.maketrans(
+        string.ascii_uppercase + string.ascii_lowercase,
+        string.ascii_uppercase[shift:] + string.ascii_uppercase[:shift]
+        + string.ascii_lowercase[shift:] + string.ascii_lowercase[:shift]
+    )
+    for shift in range(26)
+)
+
+_ASCII_LETTERS = string.ascii_uppercase + string.ascii_lowercase
+ATBASH = str.maketrans(_ASCII_LETTERS, string.ascii_uppercase[::-1] + string.ascii_lowercase[::-1])
+
+# bytes.translate tables matching ASCII_TABLES and ATBASH
+BYTE_TABLES = tuple(
+    bytes.maketrans(_ASCII_LETTERS.encode(), _ASCII_LETTERS.translate(table).encode())
+    for table in ASCII_TABLES
+)
+BYTE_ATBASH = bytes.maketrans(_ASCII_LETTERS.encode(), _ASCII_LETTERS.translate(ATBASH).encode())
+
+# Beaufort (c = k - p) is Atbash followed by a shift of k + 1, composed into one table per key letter
+BEAUFORT_TABLES = tuple(
+    {code: table[ATBASH[code]] for code in ATBASH}
+    for table in ASCII_TABLES[1:] + ASCII_TABLES[:1]
+)
+
+
+def _letter_value(char):
+    return (ord(char) | 32) - 97
+
+
+# Autokey encryption: key letter -> {plaintext letter: ciphertext letter}
+AUTOKEY_ROWS = {
+    key: dict(zip(_ASCII_LETTERS, _ASCII_LETTERS.translate(ASCII_TABLES[_letter_value(key)])))
+    for key in _ASCII_LETTERS
+}
+
+
+class _AutokeyState(dict):
+    """Last recovered plaintext letter; maps the next ciphertext letter to the next state"""
+
+    __slots__ = ('letter',)
+
+
+# Autokey decryption feeds each plaintext letter back in as key, so it runs as a state machine
+AUTOKEY_STATES = {letter: _AutokeyState() for letter in _ASCII_LETTERS}
+for _letter, _state in AUTOKEY_STATES.items():
+    _state.letter = _letter
+    _inverse = ASCII_TABLES[-_letter_value(_letter) % 26]
+    for _char in _ASCII_LETTERS:
+        _state[_char] = AUTOKEY_STATES[_char.translate(_inverse)]
+del _letter, _state, _inverse, _char
+_STATE_LETTER = attrgetter('letter')
+
+
+def caesar(text, shift=3, decrypt=False):
+    """Shift alphabetic characters of text by shift positions - O(n) in one C-level pass"""
+    if decrypt:
+        shift = -shift
+    return text.translate(CAESAR_TABLES[shift % 26])
+
+
+def caesar_bytes(data, shift=3, decrypt=False, out=None):
+    """Caesar over the ASCII letters of a bytes-like object; see translate_bytes for out"""
+    if decrypt:
+        shift = -shift
+    return translate_bytes(data, BYTE_TABLES[shift % 26], out)
+
+
+def translate_bytes(data, table, out=None):
+    """bytes.translate for any buffer.
+
+    Returns bytes when out is None; otherwise fills out (which may be data
+    itself) and returns it. Buffers other than bytes are translated in
+    BYTES_BLOCK slices, so the only temporary is one block.
+    """
+    if out is None and isinstance(data, bytes):
+        return data.translate(table)
+    view = memoryview(data).cast('B')
+    if out is None:
+        out = bytearray(len(view))
+    target = memoryview(out).cast('B')
+    if len(target) < len(view):
+        raise ValueError("Output buffer is too small")
+    for start in range(0, len(view), BYTES_BLOCK):
+        block = view[start:start + BYTES_BLOCK]
+        target[start:start + len(block)] = block.tobytes().translate(table)
+    return out
+
+
+def shift_letters(text, shifts, engine='auto'):
+    """Shift the i-th ASCII letter of text by shifts[i % len(shifts)].
+
+    This is the polyalphabetic core: one shift is a Caesar cipher, a
+    repeating key vector is Vigenere. Non-letters pass through and do not
+    advance the key. engine is 'auto', 'python' or 'numpy'; 'auto' picks
+    NumPy for large ASCII inputs with a multi-letter key when it is installed
+    (a single shift is one str.translate pass, which NumPy does not beat).
+    """
+    shifts = [shift % 26 for shift in shifts]
+    if text.isascii() and _use_numpy(len(text), len(shifts), engine):
+        return _numpy_shift(text.encode('ascii'), shifts).decode('ascii')
+    return _translate_letters(text, [ASCII_TABLES[shift] for shift in shifts])
+
+
+class KeySchedule:
+    """One (cipher, key, direction) compiled into translation tables"""
+
+    __slots__ = ('cipher', 'decrypt', 'shifts', 'tables')
+
+    def __init__(self, cipher, shifts, decrypt=False):
+        self.cipher = cipher
+        self.decrypt = decrypt
+        if cipher == 'vigenere':
+            self.shifts = tuple(-shift % 26 if decrypt else shift for shift in shifts)
+            self.tables = tuple(ASCII_TABLES[shift] for shift in self.shifts)
+        elif cipher == 'beaufort':
+            # Beaufort is its own inverse, so both directions share one schedule
+            self.shifts = tuple((shift + 1) % 26 for shift in shifts)
+            self.tables = tuple(BEAUFORT_TABLES[shift] for shift in shifts)
+        elif cipher == 'autokey':
+            self.shifts = tuple(shifts)
+            self.tables = None
+        else:
+            raise ValueError(f"Unsupported cipher '{cipher}'")
+
+    def apply(self, text, engine='auto'):
+        """Encrypt or decrypt text; non-letters pass through and do not advance the key"""
+        if self.cipher == 'autokey':
+            return _autokey(text, self.shifts, self.decrypt)
+        if text.isascii() and _use_numpy(len(text), len(self.shifts), engine):
+            if self.cipher == 'beaufort':
+                text = text.translate(ATBASH)
+            return _numpy_shift(text.encode('ascii'), self.shifts).decode('ascii')
+        return _translate_letters(text, self.tables)
+
+    def apply_bytes(self, data, engine='auto', out=None):
+        """apply() for a bytes-like object, filling out when given (out may be data itself)"""
+        view = memoryview(data).cast('B')
+        if self.cipher != 'autokey' and _use_numpy(len(view), len(self.shifts), engine):
+            if self.cipher == 'beaufort':
+                view = memoryview(translate_bytes(view, BYTE_ATBASH, out))
+            return _numpy_shift(view, self.shifts, out)
+        # Latin-1 maps every byte to one character, so UTF-8 sequences pass through untouched
+        result = self.apply(str(view, 'latin-1'), 'python').encode('latin-1')
+        if out is None:
+            return result
+        target = memoryview(out).cast('B')
+        if len(target) < len(result):
+            raise ValueError("Output buffer is too small")
+        target[:len(result)] = result
+        return out
+
+
+@lru_cache(maxsize=256)
+def compile_key(cipher, key, decrypt=False):
+    """Cached KeySchedule for cipher under key; only the ASCII letters of key count"""
+    shifts = [_letter_value(char) for char in key if char in _ASCII_LETTERS]
+    if not shifts:
+        raise ValueError("Key must contain at least one letter A-Z")
+    if len(shifts) > MAX_KEY_LETTERS:
+        raise ValueError(f"Key is limited to {MAX_KEY_LETTERS} letters")
+    return KeySchedule(cipher, shifts, decrypt)
+
+
+def continue_key(cipher, key, plaintext):
+    """Key that picks up cipher's key stream right after plaintext (bytes-like).
+
+    Lets a long input be processed in windows, each under the key returned
+    for the windows before it.
+    """
+    letters = bytes(plaintext).translate(None, _NON_LETTER_BYTES).decode('ascii')
+    key = ''.join(char for char in key if char in _ASCII_LETTERS)
+    if cipher == 'autokey':
+        return (key + letters[-len(key):])[-len(key):]
+    offset = len(letters) % len(key)
+    return key[offset:] + key[:offset]
+
+
+def load_numpy():
+    """Import NumPy on first use and return it"""
+    global np
+    if np is None:
+        import numpy
+        np = numpy
+    return np
+
+
+def _use_numpy(size, period, engine):
+    if engine == 'numpy':
+        if not HAVE_NUMPY:
+            raise RuntimeError("NumPy is not installed")
+        return True
+    return engine == 'auto' and HAVE_NUMPY and period > 1 and size >= NUMPY_MIN_CHARS
+
+
+def _letters(text):
+    if text.isascii():
+        return text.encode('ascii').translate(None, _NON_LETTER_BYTES).decode('ascii')
+    return _NON_LETTERS.sub('', text)
+
+
+def _splice(text, letters):
+    """Put letters back into the letter runs of text"""
+    parts = _LETTER_RUNS.split(text)
+    runs = parts[1::2]
+    ends = list(accumulate(map(len, runs)))
+    parts[1::2] = map(letters.__getitem__, map(slice, [0] + ends[:-1], ends))
+    return ''.join(parts)
+
+
+def _translate_letters(text, tables):
+    period = len(tables)
+    if period == 1:
+        return text.translate(tables[0])
+
+    # Translate the letters on their own (one pass per key position), then splice them back
+    letters = _letters(text)
+    if not letters:
+        return text
+    out = list(letters)
+    for i, table in enumerate(tables):
+        out[i::period] = letters[i::period].translate(table)
+    return _splice(text, ''.join(out))
+
+
+def _autokey(text, shifts, decrypt):
+    """Autokey over the letters of text, one column per keyword position.
+
+    Column i is keyed by keyword letter i and then by its own preceding
+    plaintext letters, so every step is a table lookup driven from C.
+    """
+    letters = _letters(text)
+    if not letters:
+        return text
+    period = len(shifts)
+    keyword = [string.ascii_uppercase[shift] for shift in shifts]
+    out = list(letters)
+    for i in range(min(period, len(letters))):
+        column = letters[i::period]
+        if decrypt:
+            states = accumulate(column, dict.__getitem__, initial=AUTOKEY_STATES[keyword[i]])
+            next(states)
+            out[i::period] = map(_STATE_LETTER, states)
+        else:
+            rows = map(AUTOKEY_ROWS.__getitem__, chain(keyword[i], column[:-1]))
+            out[i::period] = map(dict.__getitem__, rows, column)
+    return _splice(text, ''.join(out))
+
+
+def _numpy_shift(data, shifts, out=None):
+    """Masked uint8 arithmetic over data in blocks; the key index is a running letter count
+
+    Returns bytes, or writes into out (which may alias data) and returns it.
+    """
+    np = load_numpy()
+    src = np.frombuffer(data, dtype=np.uint8)
+    if out is None:
+        target = np.empty_like(src)
+    else:
+        target = np.frombuffer(out, dtype=np.uint8)
+        if len(target) < len(src):
+            raise ValueError("Output buffer is too small")
+    key = np.array(shifts, dtype=np.uint8)
+    period = len(key)
+    seen = 0
+    for start in range(0, len(src), NUMPY_BLOCK):
+        block = src[start:start + NUMPY_BLOCK]
+        offset = (block | 32) - 97          # a-z and A-Z land on 0..25; everything else wraps above
+        letters = offset < 26
+        if period == 1:
+            step = key[0]
+        else:
+            index = np.cumsum(letters, dtype=np.int64)
+            index += seen - 1
+            seen = int(index[-1]) + 1
+            step = key[index % period]
+        shifted = (offset + step) % 26 + 65 + (block & 32)
+        np.copyto(target[start:start + len(block)], np.where(letters, shifted, block), casting='unsafe')
+    return target.tobytes() if out is None else out
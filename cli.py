@@ -0,0 +1,256 @@
+"""
+Command-line file encryption for Text Encrypter
+Memory-mapped bulk encrypt/decrypt/hash over files and directory trees
+
+    python cli.py encrypt dumps/ --workers 4          # -> dumps.enc/
+    python cli.py decrypt dumps.enc/ -o restored/
+    python cli.py hash nightly.sql --algorithm blake2b
+
+Each input is mapped one window at a time, so memory stays bounded by the
+window size whatever the file size. Files are spread over a process pool,
+one file per task. 'stream' (segmented AES-GCM, the /stream format) is the
+default method. The classical ciphers preserve length, so their output
+file is mapped as well and written in place.
+"""
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import getpass
+import mmap
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import ciphers
+import hashing
+
+METHODS = ('stream', 'caesar') + ciphers.CIPHERS
+SUFFIX = '.enc'
+WINDOW_SIZE = 64 * 1024 * 1024
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+
+class MappedReader:
+    """File-like reader over a file mapped window bytes at a time"""
+
+    def __init__(self, f, window=WINDOW_SIZE):
+        self._f = f
+        self.size = os.fstat(f.fileno()).st_size
+        self.window = window
+        self.pos = 0
+        self._map = None
+        self._start = 0
+
+    def read(self, size=-1):
+        if self.pos >= self.size:
+            return b''
+        if self._map is None or self.pos >= self._start + len(self._map):
+            self._remap()
+        offset = self.pos - self._start
+        end = len(self._map) if size < 0 else min(len(self._map), offset + size)
+        self.pos += end - offset
+        return self._map[offset:end]
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+    def _remap(self):
+        self.close()
+        self._start = self.pos
+        length = min(self.window, self.size - self.pos)
+        self._map = mmap.mmap(self._f.fileno(), length, offset=self._start, access=mmap.ACCESS_READ)
+
+
+def mapped_windows(source, window=WINDOW_SIZE, dest=None):
+    """Yield (input view, output view or None) per window; dest is sized and mapped to match"""
+    size = os.fstat(source.fileno()).st_size
+    if dest is not None:
+        dest.truncate(size)
+    for offset in range(0, size, window):
+        length = min(window, size - offset)
+        with mmap.mmap(source.fileno(), length, offset=offset, access=mmap.ACCESS_READ) as src:
+            if dest is None:
+                with memoryview(src) as view:
+                    yield view, None
+                continue
+            with mmap.mmap(dest.fileno(), length, offset=offset) as dst:
+                with memoryview(src) as view, memoryview(dst) as out:
+                    yield view, out
+
+
+def process_file(command, source, dest, options):
+    """Run one file through the engine; returns a result dict for the report"""
+    started = time.perf_counter()
+    result = {'path': source, 'bytes': os.path.getsize(source)}
+    try:
+        if command == 'hash':
+            result['digest'] = _hash_file(source, options)
+        else:
+            os.makedirs(os.path.dirname(dest) or '.', exist_ok=True)
+            try:
+                _crypt_file(command == 'decrypt', source, dest, options)
+            except BaseException:
+                if os.path.exists(dest):
+                    os.remove(dest)
+                raise
+    except Exception as e:
+        result['error'] = str(e)
+    result['seconds'] = time.perf_counter() - started
+    return result
+
+
+def _hash_file(source, options):
+    hasher = hashing.new_hasher(options['algorithm'])
+    with open(source, 'rb') as f:
+        for view, _ in mapped_windows(f, options['window']):
+            hasher.update(view)
+    return hasher.hexdigest()
+
+
+def _crypt_file(decrypt, source, dest, options):
+    # Imported here so pool workers build their own engine, as offload does. main() points
+    # STATS_DIR at a private directory first, so this never counts towards the server's stats
+    from app import crypto
+
+    method = options['method']
+    password = options['password']
+    with open(source, 'rb') as src, open(dest, 'w+b') as dst:
+        if method == 'stream':
+            reader = MappedReader(src, options['window'])
+            try:
+                if decrypt:
+                    chunks = crypto.stream_decrypt(reader, password)
+                else:
+                    chunks = crypto.stream_encrypt(reader, password, options['chunk_size'])
+                for chunk in chunks:
+                    dst.write(chunk)
+            finally:
+                reader.close()
+            return
+
+        key = password
+        for view, out in mapped_windows(src, options['window'], dst):
+            if method == 'caesar':
+                crypto.caesar_bytes(view, options['shift'], decrypt, out=out)
+                continue
+            crypto.polyalphabetic_bytes(method, view, key, decrypt, out=out)
+            key = ciphers.continue_key(method, key, out if decrypt else view)
+
+
+def plan(command, source, dest=None):
+    """List (source file, destination file) pairs, mirroring directory trees"""
+    if command == 'hash':
+        dest_for = lambda path: None
+    elif command == 'encrypt':
+        dest_for = lambda path: path + SUFFIX
+    else:
+        dest_for = lambda path: path[:-len(SUFFIX)] if path.endswith(SUFFIX) else path + '.dec'
+
+    if os.path.isfile(source):
+        return [(source, dest or dest_for(source))]
+    if not os.path.isdir(source):
+        raise FileNotFoundError(f"No such file or directory: {source}")
+
+    root = source.rstrip(os.sep)
+    dest_root = dest or (dest_for(root) if command != 'hash' else None)
+    jobs = []
+    for directory, _, files in os.walk(root):
+        for name in sorted(files):
+            path = os.path.join(directory, name)
+            target = None
+            if dest_root is not None:
+                target = dest_for(os.path.join(dest_root, os.path.relpath(path, root)))
+            jobs.append((path, target))
+    return jobs
+
+
+def run(command, jobs, options, workers):
+    """Process every job, printing one report line per file; returns the results"""
+    results = []
+    started = time.perf_counter()
+    if workers <= 1:
+        for source, dest in jobs:
+            results.append(_report(process_file(command, source, dest, options)))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(process_file, command, source, dest, options) for source, dest in jobs]
+            for future in as_completed(futures):
+                results.append(_report(future.result()))
+
+    elapsed = time.perf_counter() - started
+    total = sum(result['bytes'] for result in results)
+    failed = sum(1 for result in results if 'error' in result)
+    print(f"{len(results)} files, {total / 1024 ** 2:.1f} MB in {elapsed:.2f}s "
+          f"({_rate(total, elapsed)} MB/s), {failed} failed", file=sys.stderr)
+    return results
+
+
+def _report(result):
+    if 'error' in result:
+        print(f"❌ {result['path']}: {result['error']}", file=sys.stderr)
+    elif 'digest' in result:
+        print(f"{result['digest']}  {result['path']}")
+    else:
+        print(f"✅ {result['path']}: {result['bytes'] / 1024 ** 2:.1f} MB in {result['seconds']:.2f}s "
+              f"({_rate(result['bytes'], result['seconds'])} MB/s)", file=sys.stderr)
+    return result
+
+
+def _rate(size, seconds):
+    return f"{size / seconds / 1024 ** 2:.1f}" if seconds else 'inf'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Text Encrypter file CLI")
+    parser.add_argument('command', choices=('encrypt', 'decrypt', 'hash'))
+    parser.add_argument('source', help="file or directory")
+    parser.add_argument('-o', '--output', help="output file or directory (default: add/strip .enc)")
+    parser.add_argument('-m', '--method', choices=METHODS, default='stream')
+    parser.add_argument('-p', '--password', default=os.environ.get('TEXT_ENCRYPTER_PASSWORD'),
+                        help="password or cipher key (default: $TEXT_ENCRYPTER_PASSWORD, else prompt)")
+    parser.add_argument('--shift', type=int, default=3, help="Caesar shift")
+    parser.add_argument('--algorithm', choices=sorted(hashing.ALGORITHMS), default='sha256')
+    parser.add_argument('--chunk-size', type=int, default=STREAM_CHUNK_SIZE,
+                        help="stream segment size in bytes")
+    parser.add_argument('--window', type=int, default=WINDOW_SIZE // 1024 ** 2,
+                        help="mapping window in MB")
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args(argv)
+
+    password = args.password
+    if args.command != 'hash' and args.method != 'caesar' and password is None:
+        password = getpass.getpass("Password: ")
+    options = {
+        'method': args.method,
+        'password': password,
+        'shift': args.shift,
+        'algorithm': args.algorithm,
+        'chunk_size': args.chunk_size,
+        # mmap offsets must be multiples of the allocation granularity
+        'window': max(1, args.window * 1024 ** 2 // mmap.ALLOCATIONGRANULARITY) * mmap.ALLOCATIONGRANULARITY
+    }
+
+    try:
+        jobs = plan(args.command, args.source, args.output)
+    except FileNotFoundError as e:
+        parser.error(str(e))
+
+    stats_dir = None
+    if 'STATS_DIR' not in os.environ:
+        # Pool workers inherit the environment, so none of them share the server's counters
+        stats_dir = os.environ['STATS_DIR'] = tempfile.mkdtemp(prefix='text-encrypter-cli-')
+    try:
+        results = run(args.command, jobs, options, min(args.workers, len(jobs)))
+    finally:
+        if stats_dir is not None:
+            del os.environ['STATS_DIR']
+            shutil.rmtree(stats_dir, ignore_errors=True)
+    return 1 if any('error' in result for result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
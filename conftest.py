@@ -0,0 +1,86 @@
+"""
+Shared pytest setup for Text Encrypter
+Isolates each test process before app.py is imported
+
+app.py reads its configuration from the environment at import time, so
+this file sets it first: statistics go to a private temporary STATS_DIR,
+no on-disk result cache or KDF calibration, and heavy work runs inline.
+Every pytest-xdist worker imports this separately and gets its own
+directory, which it removes when its session ends.
+
+It also collects the bytes/sec figures the fuzz tests record per engine
+and prints them at the end of the run (FUZZ_REPORT=path also writes them
+as JSON). Under pytest-xdist each worker hands its figures back to the
+controller, which merges them before printing.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+
+STATS_DIR = os.environ['STATS_DIR'] = tempfile.mkdtemp(prefix='text-encrypter-test-')
+os.environ.pop('RESULT_CACHE_DIR', None)
+os.environ.pop('KDF_CALIBRATE_MS', None)
+os.environ['OFFLOAD_WORKERS'] = '0'
+os.environ['KEY_POOL_SIZE'] = '0'
+
+import pytest
+
+import app as app_module
+
+
+@pytest.fixture
+def client():
+    app_module.app.config['TESTING'] = True
+    with app_module.app.test_client() as client:
+        yield client
+
+
+THROUGHPUT = {}
+
+
+@pytest.fixture(scope='session')
+def throughput():
+    """record(engine, size, seconds) adds one timed call to the end-of-run table"""
+    def record(engine, size, seconds):
+        _add(engine, {'calls': 1, 'bytes': size, 'seconds': seconds})
+    return record
+
+
+def _add(engine, figures):
+    entry = THROUGHPUT.setdefault(engine, {'calls': 0, 'bytes': 0, 'seconds': 0.0})
+    for name, value in figures.items():
+        entry[name] += value
+
+
+def pytest_sessionfinish(session):
+    # xdist workers only: workeroutput is sent back to the controller when the worker exits
+    workeroutput = getattr(session.config, 'workeroutput', None)
+    if workeroutput is not None:
+        workeroutput['throughput'] = THROUGHPUT
+    shutil.rmtree(STATS_DIR, ignore_errors=True)
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_testnodedown(node, error):
+    for engine, figures in getattr(node, 'workeroutput', {}).get('throughput', {}).items():
+        _add(engine, figures)
+
+
+def pytest_terminal_summary(terminalreporter):
+    if not THROUGHPUT:
+        return
+    report = {
+        engine: dict(entry, mb_per_s=round(entry['bytes'] / entry['seconds'] / 1024 ** 2, 2)
+                     if entry['seconds'] else None)
+        for engine, entry in sorted(THROUGHPUT.items())
+    }
+    terminalreporter.section('engine throughput')
+    terminalreporter.write_line(f"  {'Engine':<32} {'Calls':>7} {'MB':>9} {'MB/s':>9}")
+    for engine, entry in report.items():
+        terminalreporter.write_line(f"  {engine:<32} {entry['calls']:>7} "
+                                    f"{entry['bytes'] / 1024 ** 2:>9.2f} {entry['mb_per_s']!s:>9}")
+    if os.environ.get('FUZZ_REPORT'):
+        with open(os.environ['FUZZ_REPORT'], 'w') as f:
+            json.dump(report, f, indent=2)
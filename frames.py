@@ -0,0 +1,98 @@
+"""
+Binary envelope for Text Encrypter
+Length-prefixed fields so /process payloads skip JSON escaping and base64
+
+    field = name length (u8) | name (ASCII) | value length (u32, big-endian) | value
+
+A request is a run of fields (method, action, password, shift, kdf)
+plus a 'data' field holding the payload bytes. Numbers travel as decimal
+text. A response uses the same layout: result, method, action and length,
+or a single error field. Unknown or repeated names are rejected, and the
+whole envelope, framing included, is held to the caller's byte limit.
+"""
+
+import struct
+
+from stream_cipher import read_chunk
+
+CONTENT_TYPE = 'application/x-text-encrypter-frames'
+NAME = struct.Struct('>B')
+LENGTH = struct.Struct('>I')
+MAX_FIELD_SIZE = 64 * 1024   # every field except 'data'
+REQUEST_FIELDS = frozenset({'method', 'action', 'password', 'shift', 'kdf', 'data'})
+RESPONSE_FIELDS = frozenset({'result', 'method', 'action', 'length', 'error'})
+READ_SIZE = 1024 * 1024
+
+
+def read_exact(reader, size):
+    """Read exactly size bytes into one preallocated bytearray"""
+    buf = bytearray(size)
+    view = memoryview(buf)
+    pos = 0
+    while pos < size:
+        chunk = reader.read(min(size - pos, READ_SIZE))
+        if not chunk:
+            raise ValueError("Request body is truncated")
+        view[pos:pos + len(chunk)] = chunk
+        pos += len(chunk)
+    return buf
+
+
+def read_body(reader, length, limit):
+    """Whole request body as a bytearray, refusing anything over limit bytes"""
+    if length is not None:
+        if length > limit:
+            raise ValueError(f"Payload limited to {limit} bytes")
+        return read_exact(reader, length)
+    buf = bytearray()
+    while True:
+        chunk = reader.read(READ_SIZE)
+        if not chunk:
+            return buf
+        buf += chunk
+        if len(buf) > limit:
+            raise ValueError(f"Payload limited to {limit} bytes")
+
+
+def read_fields(reader, limit, names=REQUEST_FIELDS):
+    """Parse an envelope of at most limit bytes into {name: bytes}; 'data' comes back as a bytearray"""
+    fields = {}
+    total = 0
+    while True:
+        head = read_chunk(reader, NAME.size)
+        if not head:
+            return fields
+        raw_name = read_chunk(reader, NAME.unpack(head)[0])
+        length = read_chunk(reader, LENGTH.size)
+        if len(raw_name) != NAME.unpack(head)[0] or len(length) != LENGTH.size:
+            raise ValueError("Request body is truncated")
+        name = raw_name.decode('ascii', 'replace')
+        if name not in names:
+            raise ValueError(f"Unexpected field '{name}'")
+        if name in fields:
+            raise ValueError(f"Field '{name}' is repeated")
+        size = LENGTH.unpack(length)[0]
+        if size > (limit if name == 'data' else MAX_FIELD_SIZE):
+            raise ValueError(f"Field '{name}' is too large")
+        total += NAME.size + len(raw_name) + LENGTH.size + size
+        if total > limit:
+            raise ValueError(f"Payload limited to {limit} bytes")
+        if name == 'data':
+            fields[name] = read_exact(reader, size)
+        else:
+            fields[name] = read_chunk(reader, size)
+            if len(fields[name]) != size:
+                raise ValueError("Request body is truncated")
+
+
+def encode(fields):
+    """Serialize {name: bytes | str | int} into an envelope"""
+    parts = []
+    for name, value in fields.items():
+        if isinstance(value, str):
+            value = value.encode()
+        elif isinstance(value, int):
+            value = str(value).encode()
+        name = name.encode('ascii')
+        parts += [NAME.pack(len(name)), name, LENGTH.pack(len(value)), value]
+    return b''.join(parts)
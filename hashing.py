@@ -0,0 +1,168 @@
+"""
+Incremental hashing for Text Encrypter
+Constant-memory streaming digests, resumable sessions and Merkle tree hashes
+
+hashlib objects cannot be serialized, so "resumable" means the partial
+hash object is parked in this process under a random session id. Under
+several gunicorn workers, resumed requests need sticky routing to the
+worker that issued the id.
+"""
+
+from collections import OrderedDict, deque
+import hashlib
+import secrets
+import threading
+import time
+
+from stream_cipher import read_chunk
+
+ALGORITHMS = {
+    'sha256': hashlib.sha256,
+    'sha512': hashlib.sha512,
+    'blake2b': hashlib.blake2b,
+    'sha3_256': hashlib.sha3_256,
+    'sha3_512': hashlib.sha3_512
+}
+
+READ_SIZE = 1024 * 1024
+
+
+def new_hasher(algorithm):
+    try:
+        return ALGORITHMS[algorithm]()
+    except KeyError:
+        raise ValueError(f"Unsupported hash algorithm '{algorithm}'") from None
+
+
+def update_from(hasher, reader, read_size=READ_SIZE):
+    """Feed reader into hasher chunk by chunk; returns the number of bytes read"""
+    total = 0
+    while True:
+        chunk = reader.read(read_size)
+        if not chunk:
+            return total
+        hasher.update(chunk)
+        total += len(chunk)
+
+
+class HashSessions:
+    """Partial hash states kept between requests, bounded by count and idle TTL"""
+
+    def __init__(self, max_sessions=1024, ttl=3600):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._sessions = OrderedDict()   # id -> [hasher, algorithm, bytes, expiry]
+        self._lock = threading.Lock()
+
+    def start(self, algorithm):
+        return [new_hasher(algorithm), algorithm, 0]
+
+    def take(self, session_id):
+        """Remove and return a parked session, or None if unknown or expired"""
+        with self._lock:
+            entry = self._sessions.pop(session_id, None)
+        if entry is None or entry[3] <= time.monotonic():
+            return None
+        return entry[:3]
+
+    def park(self, state, session_id=None):
+        """Store a partial state and return its session id"""
+        session_id = session_id or secrets.token_urlsafe(16)
+        with self._lock:
+            self._sessions[session_id] = state + [time.monotonic() + self.ttl]
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        return session_id
+
+
+# Merkle tree hashing (RFC 6962 style domain separation): leaves hash 0x00 || chunk,
+# interior nodes hash 0x01 || left || right, and an unpaired node moves up a level as is.
+TREE_SCHEME = 'merkle-v1'
+LEAF_PREFIX = b'\x00'
+NODE_PREFIX = b'\x01'
+DEFAULT_LEAF_SIZE = 1024 * 1024
+MIN_LEAF_SIZE = 4096    # hashlib releases the GIL above 2 KB, so smaller leaves cannot run in parallel
+MAX_LEAF_SIZE = 64 * 1024 * 1024
+MAX_IN_FLIGHT_BYTES = 64 * 1024 * 1024   # leaf data buffered per tree_leaves call
+
+
+def _hash_leaf(algorithm, chunk):
+    hasher = new_hasher(algorithm)
+    hasher.update(LEAF_PREFIX)
+    hasher.update(chunk)
+    return hasher.digest()
+
+
+def _hash_node(algorithm, left, right):
+    return ALGORITHMS[algorithm](NODE_PREFIX + left + right).digest()
+
+
+def tree_leaves(reader, algorithm, leaf_size, pool, window=8, max_bytes=MAX_IN_FLIGHT_BYTES):
+    """Hash fixed-size leaves from reader on pool; returns (leaf digests, bytes read)
+
+    At most window leaves, and no more than max_bytes of them (but always at
+    least one), are in flight, so memory stays bounded whatever leaf size the
+    client picks, plus one digest per leaf.
+    """
+    new_hasher(algorithm)
+    if not MIN_LEAF_SIZE <= leaf_size <= MAX_LEAF_SIZE:
+        raise ValueError(f"Leaf size must be between {MIN_LEAF_SIZE} and {MAX_LEAF_SIZE} bytes")
+    window = max(1, min(window, max_bytes // leaf_size))
+
+    pending = deque()
+    leaves = []
+    total = 0
+    while True:
+        chunk = read_chunk(reader, leaf_size)
+        # Empty input still gets one empty leaf so that every input has a root
+        if not chunk and (leaves or pending):
+            break
+        total += len(chunk)
+        pending.append(pool.submit(_hash_leaf, algorithm, chunk))
+        if len(pending) >= window:
+            leaves.append(pending.popleft().result())
+        if len(chunk) < leaf_size:
+            break
+    leaves.extend(future.result() for future in pending)
+    return leaves, total
+
+
+def tree_levels(leaves, algorithm):
+    """Every level of the tree, leaves first and the root level last"""
+    levels = [leaves]
+    while len(levels[-1]) > 1:
+        level = levels[-1]
+        parents = [_hash_node(algorithm, level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            parents.append(level[-1])
+        levels.append(parents)
+    return levels
+
+
+def tree_proof(levels, index):
+    """Audit path for leaf index as ['left:<hex>' | 'right:<hex>', ...] from the leaf up"""
+    if not 0 <= index < len(levels[0]):
+        raise ValueError("Leaf index out of range")
+    proof = []
+    for level in levels[:-1]:
+        sibling = index ^ 1
+        if sibling < len(level):
+            side = 'left' if sibling < index else 'right'
+            proof.append(f'{side}:{level[sibling].hex()}')
+        index //= 2
+    return proof
+
+
+def verify_leaf(chunk, proof, root, algorithm):
+    """Check one leaf chunk against a Merkle root without the rest of the data"""
+    node = _hash_leaf(algorithm, chunk)
+    for step in proof:
+        side, _, sibling = step.partition(':')
+        sibling = bytes.fromhex(sibling)
+        if side == 'left':
+            node = _hash_node(algorithm, sibling, node)
+        elif side == 'right':
+            node = _hash_node(algorithm, node, sibling)
+        else:
+            raise ValueError(f"Invalid proof step '{step}'")
+    return node.hex() == root.lower()
@@ -0,0 +1,187 @@
+"""
+Background jobs for Text Encrypter
+Long encryptions and hashes run off the request thread, with progress polling
+
+POST /jobs queues the work on a small thread pool and answers with a job
+id right away, so no request outlives the gunicorn worker timeout. Work
+reports progress through a callback, which is also where cancellation
+takes effect. Finished jobs keep their result for JOB_TTL seconds, but
+only the newest JOB_RETAIN of them, within JOB_RETAIN_BYTES of results;
+older ones are evicted first. Like
+hash sessions, jobs live in the worker process that accepted them, so
+several gunicorn workers need sticky routing for /jobs/<id>.
+"""
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import secrets
+import threading
+import time
+
+
+class Cancelled(Exception):
+    """Raised inside a job's work once the job has been cancelled"""
+
+
+class Full(Exception):
+    """Raised when max_workers + max_pending jobs are already active"""
+
+    def __init__(self, retry_after):
+        super().__init__("Job queue is full")
+        self.retry_after = retry_after
+
+
+class Job:
+    def __init__(self, work, total, info):
+        self.id = secrets.token_urlsafe(16)
+        self.work = work
+        self.total = total
+        self.info = info
+        self.processed = 0
+        self.state = 'queued'
+        self.result = None
+        self.error = None
+        self.cancelled = False
+        self.started = None
+        self.finished = None
+        self.expires = None
+        self.future = None
+        self.size = 0
+
+    def advance(self, size):
+        """Progress callback for the work: count size more bytes, or stop if cancelled"""
+        if self.cancelled:
+            raise Cancelled()
+        self.processed += size
+
+    def status(self):
+        now = time.monotonic()
+        status = dict(self.info, id=self.id, state=self.state, processed=self.processed, total=self.total)
+        status['progress'] = round(self.processed / self.total, 4) if self.total else 0.0
+        if self.started is not None:
+            elapsed = (self.finished or now) - self.started
+            status['elapsed'] = round(elapsed, 3)
+            if self.state == 'running' and self.processed and elapsed:
+                status['eta'] = round((self.total - self.processed) * elapsed / self.processed, 3)
+        if self.error is not None:
+            status['error'] = self.error
+        if self.expires is not None:
+            status['expires_in'] = round(max(0.0, self.expires - now), 1)
+        return status
+
+
+class Jobs:
+    """Thread pool of at most max_workers running jobs and max_pending queued ones"""
+
+    def __init__(self, max_workers=2, max_pending=16, ttl=600, retry_after=1,
+                 max_retained=64, max_retained_bytes=256 * 1024 * 1024):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.ttl = ttl
+        self.retry_after = retry_after
+        self.max_retained = max_retained
+        self.max_retained_bytes = max_retained_bytes
+        self.active = 0
+        self.retained_bytes = 0
+        self._jobs = {}
+        self._finished = OrderedDict()   # finished job ids, oldest first
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+
+    def submit(self, work, total, **info):
+        """Queue work(progress) and return its Job; work returns the result payload"""
+        with self._lock:
+            self._prune()
+            if self.active >= self.max_workers + self.max_pending:
+                raise Full(self.retry_after)
+            self.active += 1
+            job = Job(work, total, info)
+            self._jobs[job.id] = job
+        job.future = self._executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id):
+        """The job, or None if unknown or expired"""
+        with self._lock:
+            self._prune()
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """Cancel a queued or running job, or discard a finished one; returns the job or None"""
+        job = self.get(job_id)
+        if job is None:
+            return None
+        if job.finished is not None:
+            with self._lock:
+                self._discard(job_id)
+            return job
+        job.cancelled = True
+        if job.future.cancel():
+            self._finish(job, 'cancelled')
+        return job
+
+    def stats(self):
+        with self._lock:
+            self._prune()
+            states = {}
+            for job in self._jobs.values():
+                states[job.state] = states.get(job.state, 0) + 1
+        return {
+            'workers': self.max_workers,
+            'queue': self.max_pending,
+            'active': self.active,
+            'ttl': self.ttl,
+            'retained': len(self._finished),
+            'retained_bytes': self.retained_bytes,
+            'states': states
+        }
+
+    def _run(self, job):
+        job.state = 'running'
+        job.started = time.monotonic()
+        state = 'failed'
+        try:
+            job.result = job.work(job.advance)
+            if 'error' in job.result:
+                job.error = job.result['error']
+            else:
+                state = 'done'
+        except Cancelled:
+            state = 'cancelled'
+        except Exception as e:
+            job.error = str(e)
+        finally:
+            self._finish(job, state)
+
+    def _finish(self, job, state):
+        # Drop the work closure, which holds the whole input, as soon as the job ends
+        job.work = None
+        if state != 'done':
+            job.result = None
+        elif job.result.get('result') is not None:
+            job.size = len(job.result['result'])
+        job.state = state
+        job.finished = time.monotonic()
+        job.expires = job.finished + self.ttl
+        with self._lock:
+            self.active -= 1
+            self._finished[job.id] = job
+            self.retained_bytes += job.size
+            while self._finished and (len(self._finished) > self.max_retained
+                                      or self.retained_bytes > self.max_retained_bytes):
+                self._discard(next(iter(self._finished)))
+
+    def _discard(self, job_id):
+        self._jobs.pop(job_id, None)
+        job = self._finished.pop(job_id, None)
+        if job is not None:
+            self.retained_bytes -= job.size
+
+    def _prune(self):
+        now = time.monotonic()
+        # Finished jobs all share one TTL, so the expired ones are the oldest
+        while self._finished:
+            job_id, job = next(iter(self._finished.items()))
+            if job.expires > now:
+                break
+            self._discard(job_id)
@@ -0,0 +1,127 @@
+"""
+Key derivation registry for Text Encrypter
+PBKDF2 and scrypt from the cryptography package, with host calibration
+
+Parameters travel in token headers as a compact string such as
+"i=100000" (PBKDF2) or "n=16384,r=8,p=1" (scrypt). Every value read
+from a header is range-checked so a crafted token cannot request an
+absurdly expensive derivation.
+"""
+
+import time
+
+KEY_LENGTH = 32
+# Worst case a token header may ask for: scrypt memory is 128 * n * r bytes per lane
+MAX_SCRYPT_MEMORY = 32 * 1024 * 1024
+MAX_PBKDF2_ITERATIONS = 600000
+
+
+class PBKDF2KDF:
+    name = 'pbkdf2'
+    defaults = {'i': 100000}
+    limits = {'i': (1000, MAX_PBKDF2_ITERATIONS)}
+
+    def derive(self, password, salt, params):
+        from cryptography.hazmat.primitives import hashes
+        from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+        return PBKDF2HMAC(
+            algorithm=hashes.SHA256(),
+            length=KEY_LENGTH,
+            salt=salt,
+            iterations=params['i']
+        ).derive(password)
+
+    def calibrate(self, target_seconds):
+        # PBKDF2 cost is linear in the iteration count, so one probe is enough
+        probe = 20000
+        elapsed = _time_derive(self, {'i': probe})
+        iterations = int(probe * target_seconds / elapsed) // 1000 * 1000
+        return {'i': _clamp(iterations, self.limits['i'])}
+
+    def validate(self, params):
+        pass
+
+
+class ScryptKDF:
+    name = 'scrypt'
+    defaults = {'n': 2 ** 14, 'r': 8, 'p': 1}
+    limits = {'n': (2 ** 10, 2 ** 18), 'r': (1, 16), 'p': (1, 2)}
+
+    def derive(self, password, salt, params):
+        from cryptography.hazmat.primitives.kdf.scrypt import Scrypt
+        return Scrypt(
+            salt=salt,
+            length=KEY_LENGTH,
+            n=params['n'],
+            r=params['r'],
+            p=params['p']
+        ).derive(password)
+
+    def calibrate(self, target_seconds):
+        # Double n (memory and time together) until one derivation reaches the target
+        params = dict(self.defaults, n=self.limits['n'][0])
+        while (params['n'] < self.limits['n'][1]
+               and _scrypt_memory(params['n'] * 2, params['r']) <= MAX_SCRYPT_MEMORY):
+            if _time_derive(self, params) >= target_seconds:
+                break
+            params['n'] *= 2
+        return params
+
+    def validate(self, params):
+        if params['n'] & (params['n'] - 1):
+            raise ValueError("scrypt n must be a power of two")
+        # n and r are range-checked one by one; their product sets the memory and time cost
+        if _scrypt_memory(params['n'], params['r']) > MAX_SCRYPT_MEMORY:
+            raise ValueError("scrypt parameters exceed the memory limit")
+
+
+KDFS = {kdf.name: kdf for kdf in (PBKDF2KDF(), ScryptKDF())}
+
+
+def get(name):
+    try:
+        return KDFS[name]
+    except KeyError:
+        raise ValueError(f"Unsupported key derivation: {name}") from None
+
+
+def format_params(params):
+    return ','.join(f'{key}={value}' for key, value in params.items())
+
+
+def parse_params(name, text):
+    """Parse and range-check a header parameter string for the named KDF"""
+    kdf = get(name)
+    params = {}
+    for field in text.split(','):
+        key, _, value = field.partition('=')
+        if key not in kdf.limits or key in params:
+            raise ValueError(f"Unexpected {name} parameter: {key}")
+        low, high = kdf.limits[key]
+        params[key] = int(value)
+        if not low <= params[key] <= high:
+            raise ValueError(f"{name} parameter {key} out of range")
+    if params.keys() != kdf.defaults.keys():
+        raise ValueError(f"Missing {name} parameters")
+    kdf.validate(params)
+    return params
+
+
+def calibrate(name, target_ms=50):
+    """Pick parameters so one derivation takes about target_ms on this host"""
+    return get(name).calibrate(target_ms / 1000)
+
+
+def _time_derive(kdf, params):
+    start = time.perf_counter()
+    kdf.derive(b'calibration', b'\0' * 16, params)
+    return max(time.perf_counter() - start, 1e-6)
+
+
+def _scrypt_memory(n, r):
+    return 128 * n * r
+
+
+def _clamp(value, bounds):
+    low, high = bounds
+    return max(low, min(high, value))
@@ -0,0 +1,142 @@
+"""
+Random key generation for Text Encrypter
+Bulk keys from one os.urandom draw, with an optional pre-filled pool
+
+Random bytes are mapped onto the charset with bytes.translate. Bytes at
+or above the largest multiple of the charset size are deleted in the same
+call, which is rejection sampling, so every character is equally likely.
+"""
+
+from collections import deque
+from functools import lru_cache
+import os
+import string
+import threading
+
+CHARSETS = {
+    'default': string.ascii_letters + string.digits + '!@#$%^&*',
+    'alphanumeric': string.ascii_letters + string.digits,
+    'letters': string.ascii_letters,
+    'digits': string.digits,
+    'hex': '0123456789abcdef',
+    'urlsafe': string.ascii_letters + string.digits + '-_'
+}
+MAX_LENGTH = 4096
+MAX_COUNT = 10000
+MAX_CHARS = 1024 * 1024   # length x count per request
+
+
+def resolve_charset(charset):
+    """Characters for a named charset, or charset itself as a literal alphabet"""
+    chars = CHARSETS.get(charset, charset)
+    if not chars.isascii() or not 2 <= len(chars) <= 128 or len(set(chars)) != len(chars):
+        raise ValueError("Charset must be a known name or 2-128 distinct ASCII characters")
+    return chars
+
+
+def validate(length, count, charset):
+    if not 1 <= length <= MAX_LENGTH:
+        raise ValueError(f"Key length must be between 1 and {MAX_LENGTH}")
+    if not 1 <= count <= MAX_COUNT:
+        raise ValueError(f"Key count must be between 1 and {MAX_COUNT}")
+    if length * count > MAX_CHARS:
+        raise ValueError(f"At most {MAX_CHARS} key characters per request")
+    return resolve_charset(charset)
+
+
+def generate(length=16, count=1, charset='default'):
+    """count keys of length characters, each drawn uniformly from charset"""
+    return _draw(validate(length, count, charset), length, count)
+
+
+@lru_cache(maxsize=64)
+def _tables(chars):
+    """(translate table, bytes to reject, acceptance limit) for an alphabet"""
+    size = len(chars)
+    limit = 256 - 256 % size
+    table = bytes(ord(chars[byte % size]) for byte in range(256))
+    return table, bytes(range(limit, 256)), limit
+
+
+def _draw(chars, length, count):
+    table, reject, limit = _tables(chars)
+    needed = length * count
+    out = b''
+    while len(out) < needed:
+        missing = needed - len(out)
+        # Over-draw by a margin above the expected rejections so one call nearly always suffices
+        out += os.urandom(missing * 256 // limit + missing // 8 + 16).translate(table, reject)
+    text = out[:needed].decode('ascii')
+    return [text[i:i + length] for i in range(0, needed, length)]
+
+
+class KeyPool:
+    """Keys of one shape generated ahead of time by a background thread.
+
+    take() is a deque pop, so requests for the pooled shape cost O(1).
+    The pool is dropped on fork, because forked workers must never hand
+    out the same keys.
+    """
+
+    def __init__(self, size=0, length=16, charset='default'):
+        self.size = size
+        self.length = length
+        self.charset = charset
+        self.hits = 0
+        self.misses = 0
+        self._keys = deque()
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._pid = None
+
+    @property
+    def enabled(self):
+        return self.size > 0
+
+    def matches(self, length, charset):
+        return self.enabled and length == self.length and charset == self.charset
+
+    def start(self):
+        """Start the refill thread in this process (again after a fork)"""
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._keys = deque()
+            self._wake = threading.Event()
+            threading.Thread(target=self._refill, args=(self._keys, self._wake),
+                             name='key-pool', daemon=True).start()
+
+    def take(self, count):
+        """Up to count pooled keys; fewer when the pool is running low"""
+        self.start()
+        keys = []
+        try:
+            for _ in range(count):
+                keys.append(self._keys.popleft())
+        except IndexError:
+            pass
+        self.hits += len(keys)
+        self.misses += count - len(keys)
+        if len(self._keys) <= self.size // 2:
+            self._wake.set()
+        return keys
+
+    def stats(self):
+        return {
+            'enabled': self.enabled,
+            'size': self.size,
+            'available': len(self._keys),
+            'hits': self.hits,
+            'misses': self.misses
+        }
+
+    def _refill(self, keys, wake):
+        chars = resolve_charset(self.charset)
+        while True:
+            missing = self.size - len(keys)
+            if missing > 0:
+                keys.extend(_draw(chars, self.length, min(missing, MAX_COUNT)))
+                continue
+            wake.wait()
+            wake.clear()
@@ -0,0 +1,270 @@
+"""
+Load Generator for Text Encrypter
+Drives /process, /generate-key and /stats at a set concurrency and request mix
+
+    python loadtest.py --duration 30 --concurrency 16                  # closed loop
+    python loadtest.py --rate 200 --duration 30 --workers 4 --threads 8  # open loop
+    python loadtest.py --url http://staging:5000 --mix caesar=1,fernet=1
+
+Without --url a server is started locally: gunicorn when installed (--workers
+and --threads set its size), otherwise the threaded Flask server. In closed
+loop every client sends its next request as soon as the last one returns.
+With --rate the arrivals follow a fixed schedule. Latency is then measured
+from each request's scheduled start, so a stalled server shows up as
+latency rather than being hidden by fewer requests (coordinated omission).
+"""
+
+import argparse
+import http.client
+import itertools
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+
+from benchmark import make_text, percentile
+
+DEFAULT_MIX = 'caesar=4,fernet=2,hash=2,generate-key=1,stats=1'
+PROCESS_METHODS = ('caesar', 'fernet', 'hash', 'vigenere', 'beaufort', 'autokey')
+
+
+def build_requests(mix, size):
+    """Map each mix entry to (name, HTTP method, path, body) and return them with their weights"""
+    text = make_text(size)
+    kinds = []
+    weights = []
+    for entry in mix.split(','):
+        name, _, weight = entry.partition('=')
+        name = name.strip()
+        if name in PROCESS_METHODS:
+            body = json.dumps({'text': text, 'method': name, 'password': 'loadtest'}).encode()
+            kinds.append((name, 'POST', '/process', body))
+        elif name == 'generate-key':
+            kinds.append((name, 'GET', '/generate-key', None))
+        elif name == 'stats':
+            kinds.append((name, 'GET', '/stats', None))
+        else:
+            raise ValueError(f"Unknown mix entry '{name}'")
+        weights.append(float(weight or 1))
+    return kinds, weights
+
+
+class Client:
+    """One keep-alive connection per load thread"""
+
+    def __init__(self, url, timeout):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self.conn = None
+
+    def send(self, method, path, body):
+        """Return True for a 200 answer without an 'error' field"""
+        if self.conn is None:
+            self.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            headers = {'Content-Type': 'application/json'} if body is not None else {}
+            self.conn.request(method, path, body=body, headers=headers)
+            response = self.conn.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException):
+            self.conn.close()
+            self.conn = None
+            return False
+        if response.status != 200:
+            return False
+        return b'"error"' not in data[:256]
+
+
+def run_load(url, kinds, weights, duration, concurrency, rate=None, timeout=30, seed=1):
+    """Run the load; returns {name: [(latency_ns, ok), ...]} plus the wall time in seconds"""
+    samples = {kind[0]: [] for kind in kinds}
+    lock = threading.Lock()
+    rng = random.Random(seed)
+    picks = rng.choices(range(len(kinds)), weights, k=1 << 16)
+    counter = itertools.count()
+    start = time.perf_counter_ns()
+    end = start + int(duration * 1e9)
+    interval = int(1e9 / rate) if rate else 0
+
+    def worker():
+        client = Client(url, timeout)
+        local = []
+        while True:
+            index = next(counter)
+            if rate:
+                # Open loop: request i is due at start + i / rate whether or not earlier ones finished
+                due = start + index * interval
+                if due >= end:
+                    break
+                delay = due - time.perf_counter_ns()
+                if delay > 0:
+                    time.sleep(delay / 1e9)
+            else:
+                due = time.perf_counter_ns()
+                if due >= end:
+                    break
+            name, method, path, body = kinds[picks[index % len(picks)]]
+            ok = client.send(method, path, body)
+            local.append((name, time.perf_counter_ns() - due, ok))
+        with lock:
+            for name, latency, ok in local:
+                samples[name].append((latency, ok))
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples, (time.perf_counter_ns() - start) / 1e9
+
+
+def summarize(samples, elapsed):
+    """Throughput, error rate and latency percentiles per request kind and overall"""
+    report = {}
+    everything = []
+    for name, entries in list(samples.items()) + [('all', None)]:
+        if entries is None:
+            entries = everything
+        else:
+            everything.extend(entries)
+        if not entries:
+            continue
+        latencies = sorted(latency for latency, _ in entries)
+        errors = sum(1 for _, ok in entries if not ok)
+        report[name] = {
+            'requests': len(entries),
+            'rps': round(len(entries) / elapsed, 1),
+            'errors': errors,
+            'error_rate': round(errors / len(entries), 4),
+            'p50_ms': round(percentile(latencies, 50) / 1e6, 3),
+            'p95_ms': round(percentile(latencies, 95) / 1e6, 3),
+            'p99_ms': round(percentile(latencies, 99) / 1e6, 3),
+            'max_ms': round(latencies[-1] / 1e6, 3)
+        }
+    return report
+
+
+def print_report(report, elapsed, mode):
+    print(f"📈 LOAD TEST ({mode}, {elapsed:.1f}s)")
+    print("-" * 86)
+    print(f"  {'Request':<14} {'Count':>8} {'Req/s':>9} {'Errors':>8} {'p50 ms':>9} {'p95 ms':>9} "
+          f"{'p99 ms':>9} {'max ms':>9}")
+    for name, row in report.items():
+        print(f"  {name:<14} {row['requests']:>8} {row['rps']:>9} {row['error_rate']:>8.2%} "
+              f"{row['p50_ms']:>9} {row['p95_ms']:>9} {row['p99_ms']:>9} {row['max_ms']:>9}")
+    print()
+
+
+def start_server(server, workers, threads, port, stats_dir=None):
+    """Start the app on 127.0.0.1:port and wait until it answers; returns the process"""
+    env = dict(os.environ)
+    if stats_dir:
+        env['STATS_DIR'] = stats_dir
+    here = os.path.dirname(os.path.abspath(__file__))
+    if server == 'gunicorn':
+        command = ['gunicorn', '-w', str(workers), '--threads', str(threads),
+                   '-b', f'127.0.0.1:{port}', '--log-level', 'warning', 'app:app']
+    else:
+        command = [sys.executable, '-c',
+                   f"import app; app.app.run(host='127.0.0.1', port={port}, threaded=True)"]
+    process = subprocess.Popen(command, cwd=here, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{server} exited with status {process.returncode}")
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return process
+        except OSError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError(f"{server} did not start within 30 seconds")
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Text Encrypter load generator")
+    parser.add_argument('--url', help="target an already running server instead of starting one")
+    parser.add_argument('--server', choices=('gunicorn', 'flask'),
+                        default='gunicorn' if shutil.which('gunicorn') else 'flask')
+    parser.add_argument('--workers', type=int, default=2, help="gunicorn worker processes")
+    parser.add_argument('--threads', type=int, default=4, help="gunicorn threads per worker")
+    parser.add_argument('--mix', default=DEFAULT_MIX,
+                        help=f"weighted request mix (default {DEFAULT_MIX})")
+    parser.add_argument('--size', type=int, default=1024, help="/process payload size in bytes")
+    parser.add_argument('--duration', type=float, default=10.0, help="seconds of load")
+    parser.add_argument('--concurrency', type=int, default=8,
+                        help="client threads (closed loop) or maximum in-flight requests (open loop)")
+    parser.add_argument('--rate', type=float, help="open loop: scheduled requests per second")
+    parser.add_argument('--warmup', type=float, default=1.0, help="seconds of unrecorded load first")
+    parser.add_argument('--timeout', type=float, default=30.0, help="per-request timeout in seconds")
+    parser.add_argument('--json', metavar='PATH', help="write the report to PATH")
+    args = parser.parse_args()
+
+    try:
+        kinds, weights = build_requests(args.mix, args.size)
+    except ValueError as e:
+        parser.error(str(e))
+    process = None
+    stats_dir = None
+    url = args.url
+    try:
+        if url is None:
+            if not os.environ.get('STATS_DIR'):
+                # Keep load runs out of the server's real stats; removed once the server stops
+                stats_dir = tempfile.mkdtemp(prefix='text-encrypter-load-')
+            port = _free_port()
+            print(f"🚀 Starting {args.server} on port {port}...")
+            process = start_server(args.server, args.workers, args.threads, port, stats_dir)
+            url = f'http://127.0.0.1:{port}'
+
+        if args.warmup:
+            run_load(url, kinds, weights, args.warmup, args.concurrency, args.rate, args.timeout)
+        samples, elapsed = run_load(url, kinds, weights, args.duration, args.concurrency,
+                                    args.rate, args.timeout)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+        if stats_dir:
+            shutil.rmtree(stats_dir, ignore_errors=True)
+
+    mode = f"open loop at {args.rate:g} req/s" if args.rate else f"closed loop x{args.concurrency}"
+    report = summarize(samples, elapsed)
+    print_report(report, elapsed, mode)
+    if args.rate and report.get('all') and report['all']['rps'] < args.rate * 0.95:
+        print(f"⚠️  Only {report['all']['rps']} req/s of the scheduled {args.rate:g} completed; "
+              f"raise --concurrency or the server is saturated\n")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({
+                'mode': mode,
+                'url': url,
+                'server': None if args.url else {'type': args.server, 'workers': args.workers,
+                                                 'threads': args.threads},
+                'mix': args.mix,
+                'size': args.size,
+                'report': report
+            }, f, indent=2)
+        print(f"💾 Report written to {args.json}\n")
+
+
+if __name__ == "__main__":
+    main()
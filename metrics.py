@@ -0,0 +1,127 @@
+"""
+Request phase metrics for Text Encrypter
+Monotonic-clock phase timings exported in the Prometheus text format
+
+A request opens a timing scope with begin(); code on the hot path wraps
+its work in phase('kdf') and friends, which costs two perf_counter_ns()
+calls and a list append. finish() flushes the scope into a StatsStore, so
+/metrics is fleet-wide across gunicorn workers just like /stats. Requests
+that end early call abort() so the scope never outlives them.
+"""
+
+import os
+import threading
+import time
+
+from stats_store import StatsStore, LATENCY_BOUNDS_NS, default_directory
+
+PHASES = ('parse', 'kdf', 'cipher', 'encode', 'serialize')
+
+store = StatsStore(os.path.join(default_directory(), 'metrics'), max_slots=512)
+_local = threading.local()
+
+
+class _Phase:
+    __slots__ = ('name', 'timings', 'started')
+
+    def __init__(self, name, timings):
+        self.name = name
+        self.timings = timings
+
+    def __enter__(self):
+        self.started = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.timings.append((self.name, time.perf_counter_ns() - self.started))
+
+
+class _NoPhase:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return None
+
+
+_NO_PHASE = _NoPhase()
+
+
+def begin():
+    """Start timing a request on this thread"""
+    _local.timings = []
+    _local.started = time.perf_counter_ns()
+
+
+def phase(name):
+    """Context manager timing one phase; a no-op outside begin()/finish()"""
+    timings = getattr(_local, 'timings', None)
+    if timings is None:
+        return _NO_PHASE
+    return _Phase(name, timings)
+
+
+def finish(method, action):
+    """Flush the current request's phases under the given labels"""
+    timings = getattr(_local, 'timings', None)
+    if timings is None:
+        return
+    total = time.perf_counter_ns() - _local.started
+    _local.timings = None
+    suffix = f'|{method}|{action}'
+    entries = [(name + suffix, 0, elapsed) for name, elapsed in timings]
+    entries.append(('request' + suffix, 0, total))
+    store.record_many(entries)
+
+
+def abort():
+    """Drop the current request's phases without recording them; a no-op after finish()"""
+    _local.timings = None
+
+
+def render(operations=None):
+    """Return all metrics in the Prometheus text exposition format"""
+    lines = []
+    phases = []
+    requests = []
+    for name, entry in sorted(store.totals().items()):
+        parts = name.split('|')
+        if len(parts) != 3:
+            continue
+        kind, method, action = parts
+        labels = f'method="{method}",action="{action}"'
+        if kind == 'request':
+            requests.append((labels, entry))
+        else:
+            phases.append((f'phase="{kind}",{labels}', entry))
+
+    _histogram(lines, 'text_encrypter_request_duration_seconds',
+               'Wall time of /process requests', requests)
+    _histogram(lines, 'text_encrypter_phase_duration_seconds',
+               'Time spent in each /process phase', phases)
+
+    if operations:
+        lines.append('# HELP text_encrypter_operations_total Operations run by the crypto engine')
+        lines.append('# TYPE text_encrypter_operations_total counter')
+        for method, entry in sorted(operations.items()):
+            lines.append(f'text_encrypter_operations_total{{method="{method}"}} {entry["count"]}')
+        lines.append('# HELP text_encrypter_chars_total Characters processed by the crypto engine')
+        lines.append('# TYPE text_encrypter_chars_total counter')
+        for method, entry in sorted(operations.items()):
+            lines.append(f'text_encrypter_chars_total{{method="{method}"}} {entry["chars"]}')
+    return '\n'.join(lines) + '\n'
+
+
+def _histogram(lines, metric, help_text, series):
+    lines.append(f'# HELP {metric} {help_text}')
+    lines.append(f'# TYPE {metric} histogram')
+    for labels, entry in series:
+        cumulative = 0
+        for bound, hits in zip(LATENCY_BOUNDS_NS, entry['buckets']):
+            cumulative += hits
+            lines.append(f'{metric}_bucket{{{labels},le="{bound / 1e9:g}"}} {cumulative}')
+        lines.append(f'{metric}_bucket{{{labels},le="+Inf"}} {entry["count"]}')
+        lines.append(f'{metric}_sum{{{labels}}} {entry["latency_ns"] / 1e9:.9f}')
+        lines.append(f'{metric}_count{{{labels}}} {entry["count"]}')
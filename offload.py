@@ -0,0 +1,107 @@
+"""
+CPU offload for Text Encrypter
+Runs expensive CryptoEngine calls on a bounded process pool
+
+With OFFLOAD_WORKERS unset (the default) every call runs inline. When it
+is set, heavy work is sent to a ProcessPoolExecutor while the request
+thread waits, so under a threaded gunicorn worker (gthread) the
+interpreter stays free for cheap requests. At most
+OFFLOAD_WORKERS + OFFLOAD_QUEUE calls may be in flight per worker
+process; past that run() raises Saturated and callers answer 503. A call
+that outlives OFFLOAD_TIMEOUT raises TimedOut but keeps its slot until it
+actually finishes, so stuck calls still count against the limit.
+"""
+
+from concurrent.futures import TimeoutError as FutureTimeout
+import os
+import threading
+
+
+class Saturated(Exception):
+    """Raised when the offload queue is full"""
+
+    def __init__(self, retry_after):
+        super().__init__("Offload queue is full")
+        self.retry_after = retry_after
+
+
+class TimedOut(Exception):
+    """Raised when an offloaded call does not finish within the timeout"""
+
+    def __init__(self, timeout):
+        super().__init__(f"Offloaded call timed out after {timeout:g} seconds")
+        self.timeout = timeout
+
+
+def _call(method, *args):
+    # Runs in the pool process; importing app gives each child its own engine and key cache
+    from app import crypto
+    return getattr(crypto, method)(*args)
+
+
+class Offloader:
+    def __init__(self, engine, max_workers=0, max_queue=None, timeout=30, retry_after=1):
+        self.engine = engine
+        self.max_workers = max_workers
+        self.max_queue = max_workers * 2 if max_queue is None else max_queue
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self._slots = threading.BoundedSemaphore(max(1, self.max_workers + self.max_queue))
+        self._lock = threading.Lock()
+        self._executor_lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self.in_flight = 0
+
+    @property
+    def enabled(self):
+        return self.max_workers > 0
+
+    def run(self, method, *args):
+        """Call crypto.<method>(*args) on the pool, or inline when offloading is off"""
+        if not self.enabled:
+            return getattr(self.engine, method)(*args)
+
+        if not self._slots.acquire(blocking=False):
+            raise Saturated(self.retry_after)
+        with self._lock:
+            self.in_flight += 1
+        try:
+            future = self._get_executor().submit(_call, method, *args)
+        except BaseException:
+            self._release()
+            raise
+        # Released when the call ends, not when this thread stops waiting for it
+        future.add_done_callback(self._release)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            # Still queued calls can be dropped; running ones hold their slot until done
+            future.cancel()
+            raise TimedOut(self.timeout) from None
+
+    def stats(self):
+        return {
+            'enabled': self.enabled,
+            'workers': self.max_workers,
+            'queue': self.max_queue,
+            'in_flight': self.in_flight
+        }
+
+    def _release(self, future=None):
+        with self._lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+    def _get_executor(self):
+        # Pools do not survive fork, so each gunicorn worker builds its own on first use
+        with self._executor_lock:
+            if self._executor is None or self._pid != os.getpid():
+                from concurrent.futures import ProcessPoolExecutor
+                import multiprocessing
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+                self._pid = os.getpid()
+            return self._executor
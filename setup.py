@@ -38,6 +38,8 @@ def install_requirements():
         'Flask==2.3.3',
         'cryptography==41.0.4', 
         'selenium==4.15.0',
+        'pytest==7.4.3',
+        'pytest-xdist==3.5.0',
         'gunicorn==21.2.0'
     ]
     
@@ -139,7 +141,8 @@ def display_next_steps():
     print("   python DSA_concepts.py")
     print()
     print("4. Run tests:")
-    print("   python test.py")
+    print("   python -m pytest -n auto   # API tests")
+    print("   python test.py             # browser tests")
     print()
 
 def run_application():
@@ -0,0 +1,137 @@
+"""
+Start-up Report for Text Encrypter
+Import cost by module, and the first-use cost of what app.py loads lazily
+
+    python startup.py                        # median of 5 fresh interpreters
+    python startup.py --repeat 10 --top 20 --json startup.json
+
+Each run imports app in a fresh interpreter under -X importtime, which is
+what every new gunicorn worker pays before it can serve. The same process
+then calls app.warmup(). Its imports and caches are what a worker
+otherwise pays on its first requests, or what gunicorn --preload with
+WARMUP=1 pays once in the master.
+"""
+
+import argparse
+import json
+import os
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)$')
+SCRIPT = """
+import json, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+steps = app.warmup()
+finished = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - started) * 1000,
+    'warmup_ms': (finished - imported) * 1000,
+    'steps': steps
+}))
+"""
+
+
+def local_modules():
+    return {name[:-3] for name in os.listdir(HERE) if name.endswith('.py')}
+
+
+def run_once(stats_dir=None):
+    """One fresh interpreter: (timings, {package: self µs} for import app, same for warmup)"""
+    env = dict(os.environ)
+    env.pop('WARMUP', None)
+    if stats_dir:
+        env['STATS_DIR'] = stats_dir
+    completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', SCRIPT], cwd=HERE, env=env,
+                               capture_output=True, text=True, check=True)
+    phases = ({}, {})
+    phase = 0
+    for line in completed.stderr.splitlines():
+        match = LINE.match(line)
+        if not match:
+            continue
+        package = match.group(4).split('.')[0]
+        phases[phase][package] = phases[phase].get(package, 0) + int(match.group(1))
+        # Lines are written as each import finishes, so everything after app's own line is warmup
+        if match.group(4) == 'app' and not match.group(3):
+            phase = 1
+    return json.loads(completed.stdout), phases[0], phases[1]
+
+
+def profile(repeat):
+    """Medians over repeat runs, after one untimed run that fills the bytecode and OS caches"""
+    # One private STATS_DIR for every run (unless one is set), removed at the end
+    stats_dir = None if os.environ.get('STATS_DIR') else tempfile.mkdtemp(prefix='text-encrypter-startup-')
+    try:
+        run_once(stats_dir)
+        runs = [run_once(stats_dir) for _ in range(repeat)]
+    finally:
+        if stats_dir:
+            shutil.rmtree(stats_dir, ignore_errors=True)
+
+    def medians(tables):
+        packages = set().union(*tables)
+        return {package: statistics.median(table.get(package, 0) for table in tables) / 1000
+                for package in packages}
+
+    steps = {name: statistics.median(run[0]['steps'].get(name, 0) for run in runs)
+             for name in runs[0][0]['steps']}
+    return {
+        'runs': repeat,
+        'import_ms': statistics.median(run[0]['import_ms'] for run in runs),
+        'warmup_ms': statistics.median(run[0]['warmup_ms'] for run in runs),
+        'warmup_steps': steps,
+        'import_packages': medians([run[1] for run in runs]),
+        'first_use_packages': medians([run[2] for run in runs])
+    }
+
+
+def print_report(report, top):
+    ours = local_modules()
+    print(f"🚀 STARTUP (median of {report['runs']} fresh interpreters)")
+    print("-" * 60)
+    print(f"  {'import app':<24} {report['import_ms']:>9.1f} ms")
+    print(f"  {'app.warmup()':<24} {report['warmup_ms']:>9.1f} ms")
+    for name, ms in report['warmup_steps'].items():
+        print(f"    {name:<22} {ms:>9.1f} ms")
+    print()
+
+    for title, packages in (("Import cost by package (self time)", report['import_packages']),
+                            ("Loaded on first use (by warmup or the first requests)",
+                             report['first_use_packages'])):
+        print(f"  {title}")
+        ranked = sorted(packages.items(), key=lambda item: -item[1])
+        for package, ms in ranked[:top]:
+            label = f"{package} *" if package in ours else package
+            print(f"    {label:<22} {ms:>9.1f} ms")
+        rest = sum(ms for _, ms in ranked[top:])
+        if rest:
+            print(f"    {'(other)':<22} {rest:>9.1f} ms")
+        print()
+    print("  * modules of this project; -X importtime adds some overhead to every figure\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Text Encrypter start-up report")
+    parser.add_argument('--repeat', type=int, default=5, help="fresh interpreters to measure")
+    parser.add_argument('--top', type=int, default=12, help="packages listed per table")
+    parser.add_argument('--json', metavar='PATH', help="write the report to PATH")
+    args = parser.parse_args()
+
+    report = profile(args.repeat)
+    print_report(report, args.top)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Report written to {args.json}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""
+Shared statistics store for Text Encrypter
+Per-worker mmap counters merged on read, so /stats is fleet-wide under gunicorn
+
+Every process writes only to its own file (worker-<pid>.stats), so workers
+never contend with each other. Readers sum all files in the directory.
+Files left behind by dead workers are folded into retired.stats. If the
+directory cannot be used, the process counts in memory instead and logs
+it once; statistics never fail a request.
+"""
+
+from bisect import bisect_left
+import glob
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+
+MAGIC = b'TXST'
+HEADER = struct.Struct('=4sI')      # magic, slot count
+MAX_SLOTS = 32
+NAME_SIZE = 48
+
+# Latency histogram upper bounds in nanoseconds; the last bucket is +Inf
+LATENCY_BOUNDS_NS = (
+    10_000, 50_000, 100_000, 500_000,
+    1_000_000, 5_000_000, 10_000_000, 50_000_000,
+    100_000_000, 500_000_000, 1_000_000_000, 5_000_000_000
+)
+BUCKETS = len(LATENCY_BOUNDS_NS) + 1
+
+# Slot: name, count, chars, latency sum (ns), histogram buckets
+# Native byte order: writers update the counters through a memoryview cast to uint64
+SLOT = struct.Struct(f'={NAME_SIZE}sQQQ{BUCKETS}Q')
+
+log = logging.getLogger(__name__)
+
+
+def default_directory():
+    return os.environ.get('STATS_DIR') or os.path.join(tempfile.gettempdir(), 'text-encrypter-stats')
+
+
+class StatsStore:
+    def __init__(self, directory=None, max_slots=MAX_SLOTS):
+        self.directory = directory or default_directory()
+        self.max_slots = max_slots
+        self.file_size = HEADER.size + max_slots * SLOT.size
+        self._lock = threading.Lock()
+        self._pid = None
+        self._mm = None
+        self._counters = None
+        self._slots = {}
+        self._in_memory = False
+        self._warned = False
+
+    def record(self, method, length, elapsed_ns):
+        """Add one operation to this worker's counters"""
+        self.record_many(((method, length, elapsed_ns),))
+
+    def record_many(self, entries):
+        """Add several (method, length, elapsed_ns) operations under one lock"""
+        with self._lock:
+            if self._pid != os.getpid():
+                self._open()
+            counters = self._counters
+            for method, length, elapsed_ns in entries:
+                index = self._slots.get(method)
+                if index is None:
+                    index = self._claim_slot(method)
+                    if index is None:
+                        continue
+                base = (HEADER.size + index * SLOT.size + NAME_SIZE) // 8
+                counters[base] += 1
+                counters[base + 1] += length
+                counters[base + 2] += elapsed_ns
+                counters[base + 3 + bisect_left(LATENCY_BOUNDS_NS, elapsed_ns)] += 1
+
+    def totals(self):
+        """Merge every worker file into {method: {count, chars, latency_ns, buckets}}"""
+        merged = {}
+        for path in glob.glob(os.path.join(self.directory, '*.stats')):
+            try:
+                with open(path, 'rb') as f:
+                    data = f.read()
+            except OSError:
+                continue
+            _merge(merged, data)
+        if self._in_memory and self._pid == os.getpid():
+            _merge(merged, self._mm)
+        return merged
+
+    def _open(self):
+        # Called on first use and again after fork, so each process gets its own file
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            try:
+                self._retire_dead_workers()
+            except OSError as e:
+                self._warn(f"could not retire old worker files in {self.directory}: {e}")
+            path = os.path.join(self.directory, f'worker-{os.getpid()}.stats')
+            with open(path, 'a+b') as f:
+                if os.path.getsize(path) < self.file_size:
+                    f.truncate(self.file_size)
+                self._mm = mmap.mmap(f.fileno(), self.file_size)
+            self._in_memory = False
+        except (OSError, ValueError) as e:
+            self._warn(f"{self.directory} is unusable ({e}); counting in memory for this process")
+            self._mm = mmap.mmap(-1, self.file_size)
+            self._in_memory = True
+        if self._mm[:4] != MAGIC:
+            HEADER.pack_into(self._mm, 0, MAGIC, self.max_slots)
+        self._counters = memoryview(self._mm).cast('Q')
+        self._pid = os.getpid()
+        self._slots = {}
+        for index in range(self.max_slots):
+            name = SLOT.unpack_from(self._mm, HEADER.size + index * SLOT.size)[0].rstrip(b'\0')
+            if name:
+                self._slots[name.decode()] = index
+
+    def _warn(self, message):
+        if not self._warned:
+            self._warned = True
+            log.warning("Statistics: %s", message)
+
+    def _claim_slot(self, method):
+        index = len(self._slots)
+        if index >= self.max_slots:
+            return None
+        name = method.encode()[:NAME_SIZE]
+        SLOT.pack_into(self._mm, HEADER.size + index * SLOT.size, name, *([0] * (3 + BUCKETS)))
+        self._slots[method] = index
+        return index
+
+    def _retire_dead_workers(self):
+        """Fold files of exited workers into retired.stats (POSIX only)"""
+        if os.name != 'posix':
+            return
+        import fcntl
+
+        with open(os.path.join(self.directory, '.lock'), 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            retired_path = os.path.join(self.directory, 'retired.stats')
+            merged = {}
+            dead = []
+            for path in glob.glob(os.path.join(self.directory, 'worker-*.stats')):
+                try:
+                    pid = int(os.path.basename(path)[7:-6])
+                except ValueError:
+                    continue   # not ours; leave stray files alone
+                if _pid_alive(pid):
+                    continue
+                with open(path, 'rb') as f:
+                    _merge(merged, f.read())
+                dead.append(path)
+            if not dead:
+                return
+            if os.path.exists(retired_path):
+                with open(retired_path, 'rb') as f:
+                    _merge(merged, f.read())
+
+            tmp_path = retired_path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(_serialize(merged, self.max_slots))
+            os.replace(tmp_path, retired_path)
+            for path in dead:
+                os.remove(path)
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _merge(merged, data):
+    if len(data) < HEADER.size:
+        return
+    magic, slots = HEADER.unpack_from(data)
+    if magic != MAGIC or len(data) < HEADER.size + slots * SLOT.size:
+        return
+    for index in range(slots):
+        values = SLOT.unpack_from(data, HEADER.size + index * SLOT.size)
+        name = values[0].rstrip(b'\0').decode(errors='replace')
+        if not name:
+            break   # slots are claimed in order, so the rest are empty
+        entry = merged.setdefault(name, {'count': 0, 'chars': 0, 'latency_ns': 0, 'buckets': [0] * BUCKETS})
+        entry['count'] += values[1]
+        entry['chars'] += values[2]
+        entry['latency_ns'] += values[3]
+        for i, hits in enumerate(values[4:]):
+            entry['buckets'][i] += hits
+
+
+def _serialize(merged, max_slots):
+    slots = max(max_slots, len(merged))
+    data = bytearray(HEADER.size + slots * SLOT.size)
+    HEADER.pack_into(data, 0, MAGIC, slots)
+    for index, (name, entry) in enumerate(merged.items()):
+        SLOT.pack_into(data, HEADER.size + index * SLOT.size, name.encode()[:NAME_SIZE],
+                       entry['count'], entry['chars'], entry['latency_ns'], *entry['buckets'])
+    return bytes(data)
@@ -0,0 +1,144 @@
+"""
+Chunked streaming encryption for Text Encrypter
+Segmented AES-GCM (STREAM construction) so memory stays O(chunk size)
+
+Layout:
+    header  = magic(4) | chunk size (u32) | nonce prefix(7)
+              | salt(16) | kdf length (u8) | kdf name.params (ASCII)
+    segment = ciphertext length (u32) | AES-GCM ciphertext + tag
+
+Every stream carries its own random salt and KDF parameters, so its key
+is derived once per stream. TXS1 streams (no salt, key from the legacy
+salt) are still decrypted.
+
+Each segment nonce is the prefix, a 32-bit sequence number and a final
+flag, and the header is bound in as associated data, so reordered,
+dropped or truncated segments fail authentication.
+"""
+
+import os
+import struct
+
+MAGIC = b'TXS2'
+LEGACY_MAGIC = b'TXS1'
+HEADER = struct.Struct('>4sI7s16sB')
+LEGACY_HEADER = struct.Struct('>4sI7s')
+LENGTH = struct.Struct('>I')
+NONCE = struct.Struct('>7sIB')
+TAG_SIZE = 16
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+MIN_CHUNK_SIZE = 1024
+MAX_CHUNK_SIZE = 16 * 1024 * 1024
+MAX_SEGMENTS = 2 ** 32
+
+
+class StreamError(Exception):
+    """Raised when a stream is malformed, truncated or fails authentication"""
+
+
+def read_chunk(reader, size):
+    """Read up to size bytes, looping over short reads until EOF"""
+    parts = []
+    remaining = size
+    while remaining:
+        data = reader.read(remaining)
+        if not data:
+            break
+        parts.append(data)
+        remaining -= len(data)
+    return b''.join(parts)
+
+
+def encrypt_stream(key, salt, kdf_spec, reader, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield the header and then one sealed segment per chunk read from reader
+
+    salt and kdf_spec ('name.params') are what key was derived with; they
+    are written to the header so decrypt_stream can derive it again.
+    """
+    if not MIN_CHUNK_SIZE <= chunk_size <= MAX_CHUNK_SIZE:
+        raise ValueError(f"Chunk size must be between {MIN_CHUNK_SIZE} and {MAX_CHUNK_SIZE} bytes")
+
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+    aead = AESGCM(key)
+    prefix = os.urandom(7)
+    spec = kdf_spec.encode('ascii')
+    header = HEADER.pack(MAGIC, chunk_size, prefix, salt, len(spec)) + spec
+    yield header
+
+    seq = 0
+    chunk = read_chunk(reader, chunk_size)
+    while True:
+        # Read one chunk ahead so the last segment can carry the final flag
+        following = read_chunk(reader, chunk_size) if len(chunk) == chunk_size else b''
+        final = not following
+        sealed = aead.encrypt(NONCE.pack(prefix, seq, final), chunk, header)
+        yield LENGTH.pack(len(sealed)) + sealed
+        if final:
+            return
+        chunk = following
+        seq += 1
+        if seq >= MAX_SEGMENTS:
+            raise StreamError("Stream too long for a single header")
+
+
+def read_header(reader):
+    """Return (header bytes, chunk size, nonce prefix, salt, kdf spec); salt and spec are None for TXS1"""
+    header = read_chunk(reader, LEGACY_HEADER.size)
+    if len(header) != LEGACY_HEADER.size:
+        raise StreamError("Stream header is truncated")
+    magic, chunk_size, prefix = LEGACY_HEADER.unpack(header)
+    if magic not in (MAGIC, LEGACY_MAGIC):
+        raise StreamError("Not an encrypted stream")
+    if not MIN_CHUNK_SIZE <= chunk_size <= MAX_CHUNK_SIZE:
+        raise StreamError("Invalid chunk size in header")
+    if magic == LEGACY_MAGIC:
+        return header, chunk_size, prefix, None, None
+
+    header += read_chunk(reader, HEADER.size - LEGACY_HEADER.size)
+    if len(header) != HEADER.size:
+        raise StreamError("Stream header is truncated")
+    salt, spec_length = HEADER.unpack(header)[3:]
+    spec = read_chunk(reader, spec_length)
+    if len(spec) != spec_length:
+        raise StreamError("Stream header is truncated")
+    try:
+        kdf_spec = spec.decode('ascii')
+    except UnicodeDecodeError:
+        raise StreamError("Invalid key derivation in header") from None
+    return header + spec, chunk_size, prefix, salt, kdf_spec
+
+
+def decrypt_stream(key_for, reader):
+    """Yield plaintext chunks, verifying each segment before it is released
+
+    key_for(salt, kdf_spec) returns the stream key for the header's values
+    (both None for a TXS1 stream).
+    """
+    header, chunk_size, prefix, salt, kdf_spec = read_header(reader)
+
+    from cryptography.exceptions import InvalidTag
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+    aead = AESGCM(key_for(salt, kdf_spec))
+    seq = 0
+    length = read_chunk(reader, LENGTH.size)
+    while True:
+        if len(length) != LENGTH.size:
+            raise StreamError("Stream is truncated")
+        size = LENGTH.unpack(length)[0]
+        if not TAG_SIZE <= size <= chunk_size + TAG_SIZE:
+            raise StreamError("Invalid segment length")
+        sealed = read_chunk(reader, size)
+        if len(sealed) != size:
+            raise StreamError("Stream is truncated")
+
+        length = read_chunk(reader, LENGTH.size)
+        final = not length
+        try:
+            plain = aead.decrypt(NONCE.pack(prefix, seq, final), sealed, header)
+        except InvalidTag:
+            raise StreamError("Wrong password or corrupted stream") from None
+        yield plain
+        if final:
+            return
+        seq += 1
@@ -0,0 +1,545 @@
+"""
+API Test Suite for Python Text Encrypter
+In-process tests of every route through Flask's test client
+
+    python -m pytest test_api.py -q
+    python -m pytest test_api.py -q -n auto     # in parallel with pytest-xdist
+
+No browser or running server is needed. conftest.py points STATS_DIR at
+a private temporary directory before the app is imported, so runs never
+touch real statistics and parallel workers never share counters.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import io
+import os
+import re
+import threading
+import time
+
+import pytest
+
+import app as app_module
+import ciphers
+import frames
+import hashing
+import jobs
+import keygen
+import offload
+import stats_store
+import stream_cipher
+
+ROUND_TRIP_METHODS = ('caesar', 'fernet') + ciphers.CIPHERS
+ACTIONS = ('encrypt', 'decrypt')
+
+# The classical ciphers shift every alphabetic character into A-Z, as the
+# original loop did, so round trips only hold when the letters are ASCII
+ASCII_TEXTS = [
+    'Hello, World!',
+    'The quick brown fox jumps over the lazy dog 0123456789',
+    'MiXeD cAsE\twith\ttabs\nand\nnewlines',
+    'emoji 🔐🚀 and symbols ∑ ≠ → stay put'
+]
+UNICODE_TEXTS = ['Grüße aus Köln', 'Привет, мир', '你好，世界', 'Ünïcödé 🔐 mixed with ASCII']
+
+
+def post(client, **body):
+    return client.post('/process', json=body).get_json()
+
+
+def round_trip(client, method, text, password='s3cret', **options):
+    encrypted = post(client, text=text, method=method, password=password, **options)
+    assert 'error' not in encrypted, encrypted
+    decrypted = post(client, text=encrypted['result'], method=method, action='decrypt',
+                     password=password, **options)
+    assert 'error' not in decrypted, decrypted
+    return encrypted['result'], decrypted['result']
+
+
+def test_index(client):
+    response = client.get('/')
+    assert response.status_code == 200
+    assert b'inputText' in response.data
+
+
+@pytest.mark.parametrize('action', ACTIONS)
+@pytest.mark.parametrize('method', app_module.METHODS)
+def test_every_method_and_action(client, method, action):
+    text = 'Attack at dawn'
+    if method == 'fernet' and action == 'decrypt':
+        text = post(client, text=text, method='fernet', password='pw')['result']
+    data = post(client, text=text, method=method, action=action, password='pw')
+
+    if method == 'hash' and action == 'decrypt':
+        assert data == {'error': 'Hash values cannot be decrypted'}
+        return
+    assert data['method'] == method
+    assert data['action'] == action
+    assert data['length'] == len(data['result'])
+    if method == 'fernet' and action == 'decrypt':
+        assert data['result'] == 'Attack at dawn'
+
+
+@pytest.mark.parametrize('text', ASCII_TEXTS)
+@pytest.mark.parametrize('method', ROUND_TRIP_METHODS)
+def test_round_trip(client, method, text):
+    encrypted, decrypted = round_trip(client, method, text)
+    assert decrypted == text
+    if method != 'fernet' and any(char.isalpha() for char in text):
+        assert encrypted != text
+
+
+@pytest.mark.parametrize('shift', [-27, -1, 0, 1, 3, 13, 25, 26, 1000])
+def test_caesar_shifts(client, shift):
+    encrypted, decrypted = round_trip(client, 'caesar', ASCII_TEXTS[1], shift=shift)
+    assert decrypted == ASCII_TEXTS[1]
+    assert encrypted == ciphers.caesar(ASCII_TEXTS[1], shift)
+
+
+@pytest.mark.parametrize('method, text, key, expected', [
+    ('caesar', 'Hello, World!', '', 'Khoor, Zruog!'),
+    ('vigenere', 'ATTACKATDAWN', 'LEMON', 'LXFOPVEFRNHR'),
+    ('vigenere', 'Attack at dawn!', 'lemon', 'Lxfopv ef rnhr!'),
+    ('beaufort', 'DEFENDTHEEASTWALLOFTHECASTLE', 'FORTIFICATION', 'CKMPVCPVWPIWUJOGIUAPVWRIWUUK'),
+    ('autokey', 'ATTACKATDAWN', 'QUEENLY', 'QNXEPVYTWTWP')
+])
+def test_known_vectors(client, method, text, key, expected):
+    assert post(client, text=text, method=method, password=key)['result'] == expected
+
+
+def test_hash_matches_hashlib(client):
+    text = 'Grüße 🔐'
+    data = post(client, text=text, method='hash')
+    assert data['result'] == hashlib.sha256(text.encode()).hexdigest()
+
+
+@pytest.mark.parametrize('text', UNICODE_TEXTS)
+def test_unicode_fernet_round_trip(client, text):
+    _, decrypted = round_trip(client, 'fernet', text, password='pässwörd 🔑')
+    assert decrypted == text
+
+
+@pytest.mark.parametrize('text', UNICODE_TEXTS)
+@pytest.mark.parametrize('method', ('caesar',) + ciphers.CIPHERS)
+def test_unicode_classical_matches_engine(client, method, text):
+    """Non-ASCII text goes through the same tables as the engine and keeps its length"""
+    data = post(client, text=text, method=method, password='key')
+    if method == 'caesar':
+        assert data['result'] == ciphers.caesar(text, 3)
+    else:
+        assert data['result'] == app_module.crypto.polyalphabetic_cipher(method, text, 'key')
+    assert len(data['result']) == len(text)
+
+
+@pytest.mark.parametrize('kdf_name', sorted(app_module.kdf.KDFS))
+def test_fernet_kdfs(client, kdf_name):
+    encrypted, decrypted = round_trip(client, 'fernet', 'secret', kdf=kdf_name)
+    assert encrypted.startswith(f'v3.{kdf_name}.')
+    assert decrypted == 'secret'
+
+
+@pytest.mark.parametrize('header', ['scrypt.n=131072,r=16,p=1', 'scrypt.n=16384,r=8,p=4', 'pbkdf2.i=2000000'])
+def test_fernet_rejects_expensive_token_headers(client, header):
+    started = time.perf_counter()
+    data = post(client, text=f'v3.{header}.AAAAAAAAAAAAAAAAAAAAAA.gAAAAA', method='fernet', action='decrypt')
+    assert data['result'] == 'Wrong password entered'
+    assert time.perf_counter() - started < 0.5
+
+
+def test_fernet_wrong_password(client):
+    token = post(client, text='secret', method='fernet', password='right')['result']
+    data = post(client, text=token, method='fernet', action='decrypt', password='wrong')
+    assert data['result'] == 'Wrong password entered'
+
+
+@pytest.mark.parametrize('body, error', [
+    ({'text': '   '}, 'Please enter some text to process'),
+    ({'text': 'x', 'method': 'rot13'}, 'Invalid encryption method'),
+    ({'text': 'x', 'shift': 'three'}, 'Shift must be a whole number'),
+    ({'text': 'x', 'shift': float('inf')}, 'Shift must be a whole number'),
+    ({'text': 'x', 'method': 'fernet', 'kdf': 'md5'}, "Unknown key derivation 'md5'"),
+    ({'text': 'x', 'method': 'vigenere', 'password': '123'},
+     'Processing failed: Key must contain at least one letter A-Z')
+])
+def test_process_errors(client, body, error):
+    response = client.post('/process', json=body)
+    assert response.status_code == 200
+    assert response.get_json() == {'error': error}
+
+
+@pytest.mark.parametrize('method', ROUND_TRIP_METHODS)
+def test_large_payload_round_trip(client, method):
+    text = ('Large payload line with Letters and 12345 digits. ' * 21000)[:1024 * 1024].strip()
+    encrypted, decrypted = round_trip(client, method, text)
+    assert decrypted == text
+    assert len(encrypted) >= len(text)
+
+
+def test_large_hash(client):
+    text = 'x' * (4 * 1024 * 1024)
+    assert post(client, text=text, method='hash')['result'] == hashlib.sha256(text.encode()).hexdigest()
+
+
+@pytest.mark.parametrize('method', ROUND_TRIP_METHODS)
+def test_binary_round_trip(client, method):
+    payload = bytes(range(256)) * 64
+    headers = {'X-Password': 'binary', 'Accept': 'application/octet-stream'}
+    encrypted = client.post(f'/process?method={method}', data=payload, headers=headers,
+                            content_type='application/octet-stream')
+    assert encrypted.mimetype == 'application/octet-stream'
+    decrypted = client.post(f'/process?method={method}&action=decrypt', data=encrypted.data,
+                            headers=headers, content_type='application/octet-stream')
+    assert decrypted.data == payload
+
+
+def test_binary_hash_and_json_fallback(client):
+    payload = b'\xff\xfe binary'
+    digest = client.post('/process?method=hash', data=payload, content_type='application/octet-stream',
+                         headers={'Accept': 'application/json'}).get_json()
+    assert digest['result'] == hashlib.sha256(payload).hexdigest()
+    data = client.post('/process?method=caesar', data=payload, content_type='application/octet-stream',
+                       headers={'Accept': 'application/json'}).get_json()
+    assert 'not UTF-8' in data['error']
+
+
+def test_frames_round_trip(client):
+    body = frames.encode({'method': 'vigenere', 'password': 'LEMON', 'data': b'ATTACKATDAWN'})
+    response = client.post('/process', data=body, content_type=frames.CONTENT_TYPE)
+    assert response.mimetype == frames.CONTENT_TYPE
+    fields = frames.read_fields(io.BytesIO(response.data), len(response.data), frames.RESPONSE_FIELDS)
+    assert fields['result'] == b'LXFOPVEFRNHR'
+    assert fields['length'] == b'12'
+
+
+@pytest.mark.parametrize('body, error', [
+    (frames.encode({'data': b'abc', 'padding': b'x'}), "Unexpected field 'padding'"),
+    (frames.encode({'data': b'abc'}) + frames.encode({'data': b'abc'}), "Field 'data' is repeated"),
+    (frames.encode({'method': 'caesar', 'password': 'p' * 60000, 'data': b'x' * 50000}), 'Payload limited'),
+    (frames.encode({'data': b'x' * 100001}), 'Payload limited|too large')
+], ids=['unknown', 'repeated', 'total', 'data'])
+def test_frames_are_bounded(client, monkeypatch, body, error):
+    monkeypatch.setattr(app_module, 'MAX_BINARY_BYTES', 100000)
+    data = client.post('/process', data=body, content_type=frames.CONTENT_TYPE,
+                       headers={'Accept': 'application/json'}).get_json()
+    assert re.search(error, data['error'])
+    # Chunked bodies carry no Content-Length, so the parser enforces the limit on its own
+    with pytest.raises(ValueError, match=error):
+        frames.read_fields(io.BytesIO(body), 100000)
+
+
+def test_batch_keeps_order_and_errors(client):
+    items = [
+        {'text': 'abc', 'method': 'caesar'},
+        {'text': 'secret', 'method': 'fernet', 'password': 'a'},
+        {'text': '', 'method': 'caesar'},
+        'not an object',
+        {'text': 'abc', 'method': 'hash'}
+    ]
+    data = client.post('/process/batch', json={'items': items}).get_json()
+    assert data['count'] == len(items)
+    results = data['results']
+    assert results[0]['result'] == 'def'
+    assert results[1]['result'].startswith('v3.')
+    assert results[2] == {'error': 'Please enter some text to process'}
+    assert results[3] == {'error': 'Each item must be a JSON object'}
+    assert results[4]['result'] == hashlib.sha256(b'abc').hexdigest()
+    assert client.post('/process/batch', json={'items': 'x'}).get_json() == {'error': 'Expected a list of items'}
+
+
+def test_batch_bad_password_fails_only_its_item(client):
+    items = [
+        {'text': 'secret', 'method': 'fernet', 'password': ['a']},
+        {'text': 'secret', 'method': 'fernet', 'password': {'a': 1}},
+        {'text': 'abc', 'method': 'caesar'}
+    ]
+    results = client.post('/process/batch', json={'items': items}).get_json()['results']
+    assert results[0] == {'error': 'Password must be a string'}
+    assert results[1] == {'error': 'Password must be a string'}
+    assert results[2]['result'] == 'def'
+
+
+def test_stream_round_trip(client):
+    payload = bytes(range(256)) * 4096
+    encrypted = client.post('/stream/encrypt?chunk_size=65536', data=payload,
+                            headers={'X-Password': 'stream'})
+    assert encrypted.mimetype == 'application/octet-stream'
+    decrypted = client.post('/stream/decrypt', data=encrypted.data, headers={'X-Password': 'stream'})
+    assert decrypted.data == payload
+    wrong = client.post('/stream/decrypt', data=encrypted.data, headers={'X-Password': 'nope'})
+    assert 'error' in wrong.get_json()
+
+
+@pytest.mark.parametrize('content_type', ['application/x-www-form-urlencoded', 'multipart/form-data'])
+def test_stream_body_types(client, content_type):
+    payload = b'name=value&raw body bytes' * 100
+    headers = {'X-Password': 'stream'}
+    if content_type == 'multipart/form-data':
+        body = {'file': (io.BytesIO(payload), 'notes.txt'), 'password': 'stream'}
+        encrypted = client.post('/stream/encrypt', data=body, content_type=content_type)
+        assert 'notes.txt.enc' in encrypted.headers['Content-Disposition']
+        encrypted.get_data()   # finish the streamed response before the next request
+        missing = client.post('/stream/encrypt', data={'password': 'stream'}, content_type=content_type)
+        assert 'file' in missing.get_json()['error']
+    else:
+        encrypted = client.post('/stream/encrypt', data=payload, headers=headers, content_type=content_type)
+    decrypted = client.post('/stream/decrypt', data=encrypted.data, headers=headers,
+                            content_type='application/x-www-form-urlencoded')
+    assert decrypted.data == payload
+
+
+def test_stream_salt_is_per_stream(client):
+    headers = {'X-Password': 'stream'}
+    first = client.post('/stream/encrypt', data=b'same', headers=headers).data
+    second = client.post('/stream/encrypt', data=b'same', headers=headers).data
+    assert first[:4] == second[:4] == stream_cipher.MAGIC
+    salts = [stream_cipher.read_header(io.BytesIO(data))[3] for data in (first, second)]
+    assert salts[0] != salts[1]
+
+
+def test_stream_decrypts_legacy_txs1(client):
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+    payload = b'legacy stream ' * 200
+    aead = AESGCM(app_module.crypto._stream_key('stream'))
+    prefix = os.urandom(7)
+    header = stream_cipher.LEGACY_HEADER.pack(stream_cipher.LEGACY_MAGIC, 1024, prefix)
+    segments = [header]
+    chunks = [payload[i:i + 1024] for i in range(0, len(payload), 1024)]
+    for seq, chunk in enumerate(chunks):
+        nonce = stream_cipher.NONCE.pack(prefix, seq, seq == len(chunks) - 1)
+        sealed = aead.encrypt(nonce, chunk, header)
+        segments.append(stream_cipher.LENGTH.pack(len(sealed)) + sealed)
+    decrypted = client.post('/stream/decrypt', data=b''.join(segments), headers={'X-Password': 'stream'})
+    assert decrypted.data == payload
+
+
+@pytest.mark.parametrize('algorithm', ['sha256', 'blake2b'])
+def test_hash_stream(client, algorithm):
+    payload = b'streamed bytes' * 10000
+    data = client.post(f'/hash/stream?algorithm={algorithm}', data=payload).get_json()
+    assert data['digest'] == hashlib.new(algorithm, payload).hexdigest()
+
+
+def test_hash_stream_resumes_across_requests(client):
+    parts = [b'first part ', bytes(range(256)) * 1000, b' last part']
+    data = client.post('/hash/stream?algorithm=blake2b&final=0', data=parts[0]).get_json()
+    session = data['session']
+    assert (data['algorithm'], data['bytes']) == ('blake2b', len(parts[0]))
+    # Later parts keep the session's algorithm; no algorithm parameter is needed
+    data = client.post(f'/hash/stream?session={session}&final=0', data=parts[1]).get_json()
+    assert data['session'] == session
+    data = client.post(f'/hash/stream?session={session}', data=parts[2]).get_json()
+    assert data['algorithm'] == 'blake2b'
+    assert data['bytes'] == sum(map(len, parts))
+    assert data['digest'] == hashlib.blake2b(b''.join(parts)).hexdigest()
+    # A finished session is gone
+    data = client.post(f'/hash/stream?session={session}', data=b'more').get_json()
+    assert data == {'error': 'Unknown or expired hash session'}
+
+
+def test_hash_stream_sessions_expire(client, monkeypatch):
+    monkeypatch.setattr(app_module.crypto, 'hash_sessions', hashing.HashSessions(ttl=0))
+    session = client.post('/hash/stream?final=0', data=b'part').get_json()['session']
+    data = client.post(f'/hash/stream?session={session}', data=b'part').get_json()
+    assert data == {'error': 'Unknown or expired hash session'}
+    assert client.post('/hash/stream?session=made-up', data=b'x').get_json() == data
+
+
+def test_hash_tree_and_proofs(client):
+    leaf = lambda chunk: hashlib.sha256(b'\x00' + chunk).digest()
+    node = lambda left, right: hashlib.sha256(b'\x01' + left + right).digest()
+    # Five leaves: the fifth has no partner on any level and moves up unchanged
+    chunks = [bytes([i]) * 4096 for i in range(4)] + [b'tail']
+    leaves = [leaf(chunk) for chunk in chunks]
+    left_half = node(node(leaves[0], leaves[1]), node(leaves[2], leaves[3]))
+    root = node(left_half, leaves[4]).hex()
+
+    data = client.post('/hash/tree?leaf_size=4096&proof=4', data=b''.join(chunks)).get_json()
+    assert (data['root'], data['leaves'], data['bytes']) == (root, 5, 4 * 4096 + 4)
+    assert data['proof'] == [f'left:{left_half.hex()}']
+
+    def verify(chunk, proof):
+        query = f"root={root}&proof={','.join(proof)}"
+        return client.post(f'/hash/tree/verify?{query}', data=chunk).get_json()['valid']
+
+    for index in (1, 4):
+        proof = client.post(f'/hash/tree?leaf_size=4096&proof={index}', data=b''.join(chunks)).get_json()['proof']
+        assert verify(chunks[index], proof)
+        assert not verify(chunks[index][:-1] + b'?', proof)
+        side, _, sibling = proof[0].partition(':')
+        tampered = f"{side}:{'0' * len(sibling)}"
+        assert not verify(chunks[index], [tampered] + proof[1:])
+
+
+def test_tree_leaves_in_flight_is_bounded_by_bytes():
+    class InlinePool:
+        """Runs each leaf when its result is collected and tracks how many wait at once"""
+        waiting = peak = 0
+
+        def submit(self, fn, *args):
+            pool = self
+            pool.waiting += 1
+            pool.peak = max(pool.peak, pool.waiting)
+
+            class Future:
+                def result(self):
+                    pool.waiting -= 1
+                    return fn(*args)
+            return Future()
+
+    pool = InlinePool()
+    leaves, total = hashing.tree_leaves(io.BytesIO(b'x' * 20 * 4096), 'sha256', 4096, pool,
+                                        window=16, max_bytes=4 * 4096)
+    assert (len(leaves), total) == (20, 20 * 4096)
+    assert pool.peak == 4
+
+
+def test_job_lifecycle(client):
+    job = client.post('/jobs', json={'text': 'ATTACKATDAWN', 'method': 'vigenere', 'password': 'LEMON'}).get_json()
+    deadline = time.monotonic() + 10
+    while job['state'] not in ('done', 'failed', 'cancelled') and time.monotonic() < deadline:
+        time.sleep(0.01)
+        job = client.get(f"/jobs/{job['id']}").get_json()
+    assert job['state'] == 'done'
+    assert job['progress'] == 1.0
+    result = client.get(f"/jobs/{job['id']}/result").get_json()
+    assert result['result'] == 'LXFOPVEFRNHR'
+    assert client.delete(f"/jobs/{job['id']}").get_json()['state'] == 'done'
+    assert client.get(f"/jobs/{job['id']}").get_json() == {'error': 'Unknown or expired job'}
+
+
+@pytest.mark.parametrize('method', ('caesar',) + ciphers.CIPHERS)
+def test_json_jobs_match_process(client, method):
+    body = {'text': 'Grüße, señor', 'method': method, 'password': 'key'}
+    job = client.post('/jobs', json=body).get_json()
+    app_module.job_queue.get(job['id']).future.result(timeout=10)
+    result = client.get(f"/jobs/{job['id']}/result").get_json()
+    assert result['result'] == post(client, **body)['result']
+
+
+def test_finished_jobs_are_capped():
+    queue = jobs.Jobs(max_workers=2, max_pending=64, max_retained=5, max_retained_bytes=2500)
+    submitted = [queue.submit(lambda progress: {'result': b'x' * 1000}, 1000) for _ in range(40)]
+    for job in submitted:
+        job.future.result()
+    stats = queue.stats()
+    assert stats['active'] == 0
+    assert stats['retained'] == 2 and stats['retained_bytes'] == 2000
+    assert queue.get(submitted[-1].id) is submitted[-1]
+    assert queue.get(submitted[0].id) is None
+    assert all(job.work is None for job in submitted)
+
+
+def test_timed_out_offload_keeps_its_slot(monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(app_module.crypto, 'stuck', release.wait, raising=False)
+    offloader = offload.Offloader(app_module.crypto, max_workers=1, max_queue=0, timeout=0.05)
+    pool = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(offloader, '_get_executor', lambda: pool)
+
+    with pytest.raises(offload.TimedOut, match='timed out after 0.05 seconds'):
+        offloader.run('stuck')
+    assert offloader.in_flight == 1
+    with pytest.raises(offload.Saturated):
+        offloader.run('stuck')
+
+    release.set()
+    pool.shutdown(wait=True)
+    assert offloader.in_flight == 0
+
+
+@pytest.mark.parametrize('query, check', [
+    ('', lambda data: len(data['key']) == 16),
+    ('?length=40&charset=hex', lambda data: len(data['key']) == 40 and set(data['key']) <= set('0123456789abcdef')),
+    ('?length=8&count=50', lambda data: data['count'] == 50 and all(len(key) == 8 for key in data['keys'])),
+    ('?count=1', lambda data: data['count'] == 1 and len(data['keys']) == 1 and 'key' not in data),
+    ('?length=0', lambda data: data['error'] == f"Key length must be between 1 and {keygen.MAX_LENGTH}"),
+    ('?count=x', lambda data: data['error'] == 'Length and count must be whole numbers'),
+    ('?charset=a', lambda data: 'Charset' in data['error'])
+])
+def test_generate_key(client, query, check):
+    assert check(client.get('/generate-key' + query).get_json())
+
+
+def test_generated_keys_are_distinct(client):
+    keys = client.get('/generate-key?length=32&count=1000').get_json()['keys']
+    assert len(set(keys)) == len(keys)
+
+
+def metric_value(text, sample):
+    """The value of one exposition line, 0 when the series has not been exported yet"""
+    match = re.search('^' + re.escape(sample) + r' (\S+)$', text, re.MULTILINE)
+    return float(match.group(1)) if match else 0
+
+
+def test_stats_and_metrics_count_requests(client):
+    labels = 'method="caesar",action="encrypt"'
+    request_count = f'text_encrypter_request_duration_seconds_count{{{labels}}}'
+    cipher_bucket = f'text_encrypter_phase_duration_seconds_bucket{{phase="cipher",{labels},le="+Inf"}}'
+    before_metrics = client.get('/metrics').get_data(as_text=True)
+    before = client.get('/stats').get_json().get('methods', {}).get('Caesar', 0)
+    for i in range(3):
+        # Distinct texts, so the result cache cannot skip the cipher phase
+        post(client, text=f'count me {i} {time.monotonic()}', method='caesar')
+    stats = client.get('/stats').get_json()
+    assert stats['methods']['Caesar'] == before + 3
+    assert {'offload', 'jobs', 'key_pool', 'key_cache', 'result_cache'} <= set(stats)
+    metrics = client.get('/metrics')
+    assert metrics.status_code == 200
+    text = metrics.get_data(as_text=True)
+    for sample in (request_count, cipher_bucket):
+        assert metric_value(text, sample) == metric_value(before_metrics, sample) + 3
+
+
+def test_metrics_scope_closes_on_early_returns(client):
+    for body in ({'data': 'not json', 'content_type': 'application/json'},
+                 {'data': 'plain', 'content_type': 'text/plain'}):
+        client.post('/process', **body)
+        assert getattr(app_module.metrics._local, 'timings', None) is None
+
+
+def test_unusable_stats_dir_never_fails_requests(client, tmp_path, monkeypatch):
+    blocker = tmp_path / 'not-a-directory'
+    blocker.write_text('')
+    monkeypatch.setattr(app_module.crypto, 'stats', stats_store.StatsStore(str(blocker / 'stats')))
+    monkeypatch.setattr(app_module.metrics, 'store', stats_store.StatsStore(str(blocker / 'metrics')))
+    for method in ('caesar', 'fernet'):
+        response = client.post('/process', json={'text': 'still works', 'method': method})
+        assert response.status_code == 200
+        assert 'result' in response.get_json()
+    assert client.get('/stats').get_json()['methods']['Caesar'] == 1
+
+
+def test_stray_stats_files_are_ignored(tmp_path):
+    (tmp_path / 'worker-stray.stats').write_bytes(b'junk')
+    store = stats_store.StatsStore(str(tmp_path))
+    store.record('Caesar', 5, 1000)
+    assert store.totals()['Caesar']['count'] == 1
+    assert (tmp_path / 'worker-stray.stats').exists()
+
+
+def test_concurrent_requests():
+    """Mixed requests from many threads give the same answers as sequential ones"""
+    cases = []
+    for i in range(96):
+        method = ROUND_TRIP_METHODS[i % len(ROUND_TRIP_METHODS)]
+        cases.append((method, f'Concurrent message {i} with key material', f'password{i % 7}'))
+
+    def run(case):
+        method, text, password = case
+        with app_module.app.test_client() as client:
+            return round_trip(client, method, text, password)
+
+    with app_module.app.test_client() as client:
+        before = client.get('/stats').get_json().get('total', 0)
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        results = list(pool.map(run, cases))
+
+    for (method, text, password), (encrypted, decrypted) in zip(cases, results):
+        assert decrypted == text
+        if method == 'caesar':
+            assert encrypted == ciphers.caesar(text, 3)
+        elif method != 'fernet':
+            assert encrypted == ciphers.compile_key(method, password, False).apply(text)
+    with app_module.app.test_client() as client:
+        assert client.get('/stats').get_json()['total'] == before + 2 * len(cases)
@@ -0,0 +1,139 @@
+"""
+Cache Test Suite for Python Text Encrypter
+Unit tests for the derived-key and result caches in caches.py
+
+    python -m pytest test_caches.py -q
+
+Expiry runs on a fake monotonic clock, so no test sleeps.
+"""
+
+import os
+
+import pytest
+
+import app as app_module
+import caches
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(caches, 'time', fake)
+    return fake
+
+
+def test_key_cache_hits_and_misses(clock):
+    cache = caches.KeyCache(max_size=4, ttl=60)
+    assert cache.get('a') is None
+    cache.put('a', b'key-a')
+    assert cache.get('a') == b'key-a'
+    assert cache.get('a') == b'key-a'
+    assert cache.stats() == {'size': 1, 'max_size': 4, 'ttl': 60, 'hits': 2, 'misses': 1, 'evictions': 0}
+
+
+def test_key_cache_expires_and_wipes(clock):
+    cache = caches.KeyCache(max_size=4, ttl=60)
+    cache.put('a', b'key-a')
+    buf = cache._entries['a'][0]
+    clock.now += 59.9
+    assert cache.get('a') == b'key-a'
+    clock.now += 0.1
+    assert cache.get('a') is None
+    assert buf == bytearray(5)
+    assert cache.stats()['size'] == 0
+    assert (cache.hits, cache.misses, cache.evictions) == (1, 1, 1)
+
+
+def test_key_cache_evicts_least_recently_used(clock):
+    cache = caches.KeyCache(max_size=2, ttl=60)
+    cache.put('a', b'key-a')
+    cache.put('b', b'key-b')
+    cache.get('a')                     # 'b' is now the least recently used
+    evicted = cache._entries['b'][0]
+    cache.put('c', b'key-c')
+    assert cache.get('b') is None
+    assert evicted == bytearray(5)
+    assert cache.get('a') == b'key-a' and cache.get('c') == b'key-c'
+    assert cache.evictions == 1
+
+
+def test_key_cache_replace_and_clear_wipe(clock):
+    cache = caches.KeyCache(max_size=2, ttl=60)
+    cache.put('a', b'old')
+    old = cache._entries['a'][0]
+    cache.put('a', b'new')
+    assert old == bytearray(3)
+    current = cache._entries['a'][0]
+    cache.clear()
+    assert current == bytearray(3)
+    assert cache.get('a') is None
+
+
+def test_disabled_key_cache_stores_nothing(clock):
+    cache = caches.KeyCache(max_size=0)
+    cache.put('a', b'key-a')
+    assert cache.get('a') is None
+    assert cache.stats()['size'] == 0
+
+
+def test_result_cache_evicts_to_byte_budget():
+    cache = caches.ResultCache(max_bytes=10, max_item=8)
+    for name in 'abc':
+        cache.put(name, name * 4)
+    assert cache.get('a') is None
+    assert cache.get('b') == 'bbbb' and cache.get('c') == 'cccc'
+    assert cache.stats()['bytes'] == 8 and cache.evictions == 1
+
+
+def test_result_cache_skips_large_inputs(client):
+    cache = caches.ResultCache(max_bytes=1024, max_item=8)
+    assert cache.cacheable('x' * 8)
+    assert not cache.cacheable('x' * 9)
+    assert not caches.ResultCache(max_bytes=0).cacheable('x')
+
+    crypto = app_module.crypto
+    entries = crypto.result_cache.stats()['entries']
+    client.post('/process', json={'text': 'x' * (crypto.result_cache.max_item + 1), 'method': 'caesar'})
+    assert crypto.result_cache.stats()['entries'] == entries
+
+
+def test_result_cache_disk_tier(tmp_path):
+    writer = caches.ResultCache(directory=str(tmp_path))
+    key = writer.key('caesar', 3, 'Grüße \ud800')
+    writer.put(key, 'Jüx\ud800')
+
+    # A fresh instance (another worker or a restart) reads it back and keeps it in memory
+    reader = caches.ResultCache(directory=str(tmp_path))
+    assert reader.get(key) == 'Jüx\ud800'
+    assert reader.get(key) == 'Jüx\ud800'
+    assert (reader.disk_hits, reader.hits, reader.misses) == (1, 1, 0)
+    assert reader.get(reader.key('caesar', 3, 'other')) is None
+    assert reader.misses == 1
+
+
+def test_result_cache_prunes_oldest_files(tmp_path):
+    cache = caches.ResultCache(directory=str(tmp_path), max_disk_bytes=250)
+    for i in range(5):
+        cache.put(f'k{i}', str(i) * 100)
+        os.utime(tmp_path / f'k{i}', (1000 + i, 1000 + i))
+    cache._prune_disk()
+    assert sorted(os.listdir(tmp_path)) == ['k3', 'k4']
+
+
+def test_fernet_never_reaches_the_result_cache(client, tmp_path, monkeypatch):
+    crypto = app_module.crypto
+    monkeypatch.setattr(crypto, 'result_cache', caches.ResultCache(directory=str(tmp_path)))
+    token = client.post('/process', json={'text': 'secret', 'method': 'fernet', 'password': 'p'}).get_json()
+    plain = client.post('/process', json={'text': token['result'], 'method': 'fernet',
+                                          'action': 'decrypt', 'password': 'p'}).get_json()
+    assert plain['result'] == 'secret'
+    assert crypto.result_cache.stats()['entries'] == 0
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,65 @@
+"""
+CLI Test Suite for Python Text Encrypter
+Runs cli.main() over a temporary directory tree
+
+    python -m pytest test_cli.py -q
+
+Files are a little over one mapping window, so every method crosses a
+window boundary (and the polyalphabetic key carries over it).
+"""
+
+import os
+import random
+
+import pytest
+
+import cli
+
+WINDOW_MB = 1
+FILES = {
+    'notes.txt': 'Attack at dawn, Grüße aus Köln! '.encode() * 40000,
+    'nested/blob.bin': random.Random(7).randbytes(WINDOW_MB * 1024 ** 2 + 4321),
+    'nested/empty.txt': b''
+}
+
+
+@pytest.fixture
+def tree(tmp_path):
+    source = tmp_path / 'plain'
+    for name, content in FILES.items():
+        path = source / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(content)
+    return tmp_path
+
+
+def read_tree(root):
+    return {os.path.relpath(os.path.join(directory, name), root).replace(os.sep, '/'):
+            open(os.path.join(directory, name), 'rb').read()
+            for directory, _, names in os.walk(root) for name in names}
+
+
+@pytest.mark.parametrize('method', ['stream', 'caesar', 'vigenere'])
+def test_tree_round_trip(tree, method):
+    options = ['-m', method, '-p', 'LEMON', '--window', str(WINDOW_MB), '-w', '1']
+    assert cli.main(['encrypt', str(tree / 'plain'), '-o', str(tree / 'sealed')] + options) == 0
+    sealed = read_tree(tree / 'sealed')
+    assert set(sealed) == {name + cli.SUFFIX for name in FILES}
+    assert sealed['notes.txt.enc'] != FILES['notes.txt']
+
+    assert cli.main(['decrypt', str(tree / 'sealed'), '-o', str(tree / 'restored')] + options) == 0
+    assert read_tree(tree / 'restored') == FILES
+
+
+def test_failed_decrypt_removes_partial_output(tree):
+    options = ['-p', 'right', '--window', str(WINDOW_MB), '-w', '1', '--chunk-size', '65536']
+    source = tree / 'plain' / 'nested' / 'blob.bin'
+    assert cli.main(['encrypt', str(source), '-o', str(tree / 'blob.enc')] + options) == 0
+
+    # Corrupt the last segment, so earlier segments decrypt and are written first
+    data = bytearray((tree / 'blob.enc').read_bytes())
+    data[-1] ^= 1
+    (tree / 'blob.enc').write_bytes(bytes(data))
+
+    assert cli.main(['decrypt', str(tree / 'blob.enc'), '-o', str(tree / 'blob.out')] + options) == 1
+    assert not (tree / 'blob.out').exists()
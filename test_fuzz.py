@@ -0,0 +1,280 @@
+"""
+Differential Fuzz Tests for Python Text Encrypter
+Random inputs through every fast path, compared with plain reference loops
+
+    python -m pytest test_fuzz.py -q
+    FUZZ_ITERATIONS=2000 FUZZ_SEED=42 python -m pytest test_fuzz.py -q
+
+The references are the straightforward per-character loops (the Caesar
+one is the original CryptoEngine code) and hashlib. Each fast engine must
+match them exactly on random unicode text, random bytes, random shifts
+and random keys. Every timed call is recorded per engine, and the bytes/sec
+table is printed at the end of the run. A failure message carries the seed
+and case number so it can be replayed with FUZZ_SEED.
+"""
+
+import base64
+import hashlib
+import io
+import os
+import random
+import time
+
+import pytest
+from cryptography.fernet import Fernet
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+
+from app import crypto
+import ciphers
+
+ITERATIONS = int(os.environ.get('FUZZ_ITERATIONS', 100))
+SEED = int(os.environ.get('FUZZ_SEED', random.randrange(2 ** 32)))
+
+ASCII_LETTERS = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz'
+ALPHABETS = [
+    ASCII_LETTERS * 4,
+    '0123456789 .,;:!?\'"-_()[]{}@#$%^&*\t\n',
+    'àéîõüßÆØÅñçÄÖÜ',                 # Latin letters outside ASCII
+    'АБВГДЕЖЗИЙабвгдежзий',           # Cyrillic
+    '漢字かなカナ한글',                 # CJK
+    '🔐🚀✨∑≠→½²',                      # emoji and symbols
+]
+
+
+def cases(name):
+    """(label, Random) pairs, seeded per test so each test replays on its own"""
+    for i in range(ITERATIONS):
+        yield f"seed={SEED} test={name} case={i}", random.Random(f'{SEED}:{name}:{i}')
+
+
+def random_size(rng):
+    """Mostly small inputs, with the occasional one past the NumPy threshold"""
+    roll = rng.random()
+    if roll < 0.05:
+        return rng.randint(ciphers.NUMPY_MIN_CHARS, 2 * ciphers.NUMPY_MIN_CHARS)
+    if roll < 0.3:
+        return rng.randint(256, 8192)
+    return rng.randint(0, 256)
+
+
+def random_text(rng, size=None, ascii_only=False):
+    """Characters drawn from a random mix of ALPHABETS, always including ASCII letters"""
+    size = random_size(rng) if size is None else size
+    extra = ALPHABETS[1:2] if ascii_only else ALPHABETS[1:]
+    pool = ALPHABETS[0] + ''.join(rng.sample(extra, rng.randint(0, len(extra))))
+    return ''.join(rng.choices(pool, k=size))
+
+
+def random_key(rng):
+    """Up to 20 characters with at least one ASCII letter; the rest is junk the engine skips"""
+    key = random_text(rng, rng.randint(0, 20))
+    return key + rng.choice(ASCII_LETTERS)
+
+
+def timed(throughput, engine, size, func, *args, **kwargs):
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    throughput(engine, size, time.perf_counter() - started)
+    return result
+
+
+# Reference implementations --------------------------------------------------
+
+def reference_caesar(text, shift=3, decrypt=False):
+    """The original CryptoEngine.caesar_cipher loop"""
+    if decrypt:
+        shift = -shift
+    result = ""
+    for char in text:
+        if char.isalpha():
+            base = 65 if char.isupper() else 97
+            result += chr((ord(char) - base + shift) % 26 + base)
+        else:
+            result += char
+    return result
+
+
+def reference_polyalphabetic(cipher, text, key, decrypt=False):
+    """Vigenere, Beaufort or autokey over ASCII letters; other characters do not advance the key"""
+    stream = [ASCII_LETTERS.index(char) % 26 for char in key if char in ASCII_LETTERS]
+    result = []
+    position = 0
+    for char in text:
+        if char not in ASCII_LETTERS:
+            result.append(char)
+            continue
+        base = 65 if char.isupper() else 97
+        value = ord(char) - base
+        k = stream[position % len(stream)]   # the autokey stream grows, so it never wraps
+        if cipher == 'beaufort':
+            out = (k - value) % 26
+        elif decrypt:
+            out = (value - k) % 26
+        else:
+            out = (value + k) % 26
+        if cipher == 'autokey':
+            stream.append(out if decrypt else value)
+        result.append(chr(out + base))
+        position += 1
+    return ''.join(result)
+
+
+def reference_bytes(cipher, data, key, decrypt=False):
+    """The bytes engines shift ASCII letters only, whatever the cipher; key is the shift for Caesar"""
+    text = data.decode('latin-1')
+    if cipher == 'caesar':
+        return reference_polyalphabetic('vigenere', text, ASCII_LETTERS[key % 26], decrypt).encode('latin-1')
+    return reference_polyalphabetic(cipher, text, key, decrypt).encode('latin-1')
+
+
+def reference_fernet_encrypt(text, password):
+    """Token in the original format: fixed salt, PBKDF2 100k, base64 around the Fernet token"""
+    kdf = PBKDF2HMAC(algorithm=hashes.SHA256(), length=32, salt=b'salt123', iterations=100000)
+    key = base64.urlsafe_b64encode(kdf.derive(password.encode()))
+    return base64.urlsafe_b64encode(Fernet(key).encrypt(text.encode())).decode()
+
+
+# Classical ciphers ----------------------------------------------------------
+
+def test_reference_vectors():
+    """The references themselves agree with the textbook examples"""
+    assert reference_caesar('Hello, World!') == 'Khoor, Zruog!'
+    assert reference_polyalphabetic('vigenere', 'ATTACKATDAWN', 'LEMON') == 'LXFOPVEFRNHR'
+    assert reference_polyalphabetic('beaufort', 'DEFENDTHEEASTWALLOFTHECASTLE', 'FORTIFICATION') \
+        == 'CKMPVCPVWPIWUJOGIUAPVWRIWUUK'
+    assert reference_polyalphabetic('autokey', 'ATTACKATDAWN', 'QUEENLY') == 'QNXEPVYTWTWP'
+    assert reference_polyalphabetic('autokey', 'QNXEPVYTWTWP', 'QUEENLY', decrypt=True) == 'ATTACKATDAWN'
+
+
+def test_caesar(throughput):
+    for label, rng in cases('caesar'):
+        text = random_text(rng)
+        shift = rng.randint(-100, 100)
+        decrypt = rng.random() < 0.5
+        size = len(text.encode())
+        expected = timed(throughput, 'caesar reference', size, reference_caesar, text, shift, decrypt)
+        assert timed(throughput, 'caesar str.translate', size, ciphers.caesar, text, shift, decrypt) \
+            == expected, label
+        assert timed(throughput, 'caesar engine (cached)', size, crypto.caesar_cipher, text, shift, decrypt) \
+            == expected, label
+        if not any(char.isalpha() and not char.isascii() for char in text):
+            assert reference_caesar(expected, shift, not decrypt) == text, label
+
+
+def test_caesar_bytes(throughput):
+    for label, rng in cases('caesar_bytes'):
+        data = rng.randbytes(random_size(rng))
+        shift = rng.randint(-100, 100)
+        decrypt = rng.random() < 0.5
+        expected = reference_bytes('caesar', data, shift, decrypt)
+        assert timed(throughput, 'caesar bytes', len(data), ciphers.caesar_bytes, data, shift, decrypt) \
+            == expected, label
+        buffer = bytearray(data)
+        timed(throughput, 'caesar bytes in place', len(data), crypto.caesar_bytes, buffer, shift, decrypt,
+              out=buffer)
+        assert buffer == expected, label
+
+
+@pytest.mark.parametrize('cipher', ciphers.CIPHERS)
+def test_polyalphabetic(cipher, throughput):
+    engines = ['python'] + (['numpy'] if ciphers.HAVE_NUMPY and cipher != 'autokey' else [])
+    for label, rng in cases(cipher):
+        text = random_text(rng, ascii_only='numpy' in engines and rng.random() < 0.5)
+        key = random_key(rng)
+        decrypt = rng.random() < 0.5
+        size = len(text.encode())
+        expected = timed(throughput, f'{cipher} reference', size, reference_polyalphabetic,
+                         cipher, text, key, decrypt)
+        schedule = ciphers.compile_key(cipher, key, decrypt)
+        for engine in engines:
+            if engine == 'numpy' and not text.isascii():
+                continue
+            assert timed(throughput, f'{cipher} {engine}', size, schedule.apply, text, engine) \
+                == expected, f'{label} engine={engine}'
+        assert crypto.polyalphabetic_cipher(cipher, text, key, decrypt) == expected, label
+        assert crypto.polyalphabetic_cipher(cipher, expected, key, not decrypt) == text, label
+
+
+@pytest.mark.parametrize('cipher', ciphers.CIPHERS)
+def test_polyalphabetic_bytes(cipher, throughput):
+    engines = ['python'] + (['numpy'] if ciphers.HAVE_NUMPY and cipher != 'autokey' else [])
+    for label, rng in cases(f'{cipher}_bytes'):
+        data = rng.randbytes(random_size(rng))
+        key = random_key(rng)
+        decrypt = rng.random() < 0.5
+        expected = reference_bytes(cipher, data, key, decrypt)
+        schedule = ciphers.compile_key(cipher, key, decrypt)
+        for engine in engines:
+            assert timed(throughput, f'{cipher} bytes {engine}', len(data), schedule.apply_bytes, data, engine) \
+                == expected, f'{label} engine={engine}'
+        buffer = bytearray(data)
+        crypto.polyalphabetic_bytes(cipher, buffer, key, decrypt, out=buffer)
+        assert buffer == expected, label
+
+
+@pytest.mark.parametrize('cipher', ciphers.CIPHERS)
+def test_windowed_key_continuation(cipher, throughput):
+    """Splitting input into windows under continue_key (as cli.py does) matches one pass"""
+    for label, rng in cases(f'{cipher}_windows'):
+        data = rng.randbytes(random_size(rng))
+        key = random_key(rng)
+        decrypt = rng.random() < 0.5
+        expected = reference_bytes(cipher, data, key, decrypt)
+        cuts = sorted(rng.randint(0, len(data)) for _ in range(rng.randint(0, 5)))
+        started = time.perf_counter()
+        out = bytearray()
+        window_key = key
+        for start, end in zip([0] + cuts, cuts + [len(data)]):
+            window = data[start:end]
+            result = crypto.polyalphabetic_bytes(cipher, window, window_key, decrypt) if window else b''
+            out += result
+            window_key = ciphers.continue_key(cipher, window_key, result if decrypt else window)
+        throughput(f'{cipher} bytes windowed', len(data), time.perf_counter() - started)
+        assert out == expected, label
+
+
+# Hashes, Fernet and streams -------------------------------------------------
+
+def test_hashes(throughput):
+    for label, rng in cases('hash'):
+        text = random_text(rng)
+        data = text.encode()
+        expected = timed(throughput, 'sha256 hashlib', len(data), lambda: hashlib.sha256(data).hexdigest())
+        assert timed(throughput, 'sha256 engine text (cached)', len(data), crypto.hash_encrypt, text) \
+            == expected, label
+        assert timed(throughput, 'sha256 engine bytes', len(data), crypto.hash_bytes, bytearray(data)).hex() \
+            == expected, label
+        reader = io.BufferedReader(io.BytesIO(data), buffer_size=rng.randint(1, 4096))
+        assert crypto.hash_stream(reader)['digest'] == expected, label
+
+
+def test_fernet(throughput):
+    passwords = ['', 'defaultpass', 'pässwörd 🔑', 'x' * 200]
+    for label, rng in cases('fernet'):
+        text = random_text(rng, rng.randint(1, 2048))
+        password = rng.choice(passwords)
+        size = len(text.encode())
+        token = timed(throughput, 'fernet encrypt', size, crypto.fernet_encrypt, text, password)
+        assert token.startswith('v3.'), label
+        assert timed(throughput, 'fernet decrypt', size, crypto.fernet_decrypt, token, password) == text, label
+        assert crypto.fernet_decrypt(token, password + 'x') == 'Wrong password entered', label
+
+
+def test_fernet_reads_reference_tokens():
+    """Tokens made by the original implementation still decrypt"""
+    for label, rng in list(cases('fernet_legacy'))[:5]:
+        text = random_text(rng, rng.randint(1, 512))
+        token = reference_fernet_encrypt(text, 'legacy')
+        assert crypto.fernet_decrypt(token, 'legacy') == text, label
+
+
+def test_stream_round_trip(throughput):
+    for label, rng in list(cases('stream'))[:max(1, ITERATIONS // 10)]:
+        data = rng.randbytes(random_size(rng) * rng.randint(1, 16))
+        chunk_size = rng.choice([1024, 4096, 65536])
+        encrypted = timed(throughput, 'aes-gcm stream encrypt', len(data),
+                          lambda: b''.join(crypto.stream_encrypt(io.BytesIO(data), 'stream', chunk_size)))
+        decrypted = timed(throughput, 'aes-gcm stream decrypt', len(data),
+                          lambda: b''.join(crypto.stream_decrypt(io.BytesIO(encrypted), 'stream')))
+        assert decrypted == data, label